@@ -0,0 +1,90 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.distributions import Categorical
+
+
+class EntityActorCritic(nn.Module):
+    """Actor-critic over the "entities" observation of Environment.
+
+    Each (dx, dy, type, hp, energy) row becomes a token, type through an
+    embedding like ActorCritic, the rest through a linear layer. The
+    creature's own stats form a query token that attends over itself and the
+    unmasked rows, so the cost follows the number of entities rather than
+    the map size. Returns action probabilities and a value, like ActorCritic.
+    """
+
+    def __init__(
+        self,
+        n_actions,
+        n_stats,
+        n_types=4,
+        embedding_dim=32,
+        n_heads=4,
+        output_dim=64,
+    ):
+        super(EntityActorCritic, self).__init__()
+
+        self.type_embedding = nn.Embedding(n_types, embedding_dim)
+        self.entity = nn.Linear(4, embedding_dim)  # dx, dy, hp, energy
+        self.own = nn.Linear(n_stats, embedding_dim)
+        self.attention = nn.MultiheadAttention(embedding_dim, n_heads, batch_first=True)
+
+        self.shared = nn.Sequential(
+            nn.Linear(2 * embedding_dim, output_dim),
+            nn.ReLU(),
+            nn.Linear(output_dim, output_dim),
+        )
+
+        # Actor (Policy) head
+        self.actor = nn.Sequential(nn.Linear(output_dim, n_actions), nn.Softmax(dim=-1))
+
+        # Critic (Value) head
+        self.critic = nn.Sequential(nn.Linear(output_dim, 1))
+
+    def forward(self, entities, entity_mask, continuous):
+        # entities: (batch, n_entities, 5), entity_mask: (batch, n_entities)
+        # continuous: (batch, n_stats)
+        types = entities[..., 2].long()
+        numbers = entities[..., [0, 1, 3, 4]].float()
+        tokens = self.type_embedding(types) + self.entity(numbers)
+
+        own = self.own(continuous.float()).unsqueeze(1)
+        # the own token is always a valid key, so no row is fully masked
+        keys = torch.cat([own, tokens], dim=1)
+        padding = torch.cat(
+            [torch.zeros_like(entity_mask[:, :1]), entity_mask == 0], dim=1
+        ).bool()
+
+        attended, _ = self.attention(own, keys, keys, key_padding_mask=padding)
+        features = self.shared(torch.cat([own, attended], dim=-1).squeeze(1))
+        action_probs = self.actor(features)
+        value = self.critic(features)
+        return action_probs, value
+
+    def choose_actions(self, obs, masks=None):
+        """Sample actions for a batch of "entities" observations."""
+        batch = {key: torch.as_tensor(np.asarray(value)) for key, value in obs.items()}
+
+        with torch.no_grad():
+            action_probs, values = self(
+                batch["entities"], batch["entity_mask"], batch["continuous"]
+            )
+            if masks is not None:
+                action_probs = action_probs * torch.as_tensor(masks)
+                action_probs = action_probs / action_probs.sum(-1, keepdim=True)
+
+        actions = Categorical(action_probs).sample()
+        return actions.numpy(), values.squeeze(1).numpy()
+
+
+if __name__ == "__main__":
+    from environment.env import Environment, EnvironmentConfig
+
+    env = Environment(EnvironmentConfig(size=64, observation_mode="entities"))
+    obs, info = env.reset()
+    model = EntityActorCritic(
+        n_actions=env.action_space.n, n_stats=obs["continuous"].shape[0]
+    )
+    batch = {key: value[None] for key, value in obs.items()}
+    print(model.choose_actions(batch, info["action_mask"][None]))
@@ -5,6 +5,7 @@ import torch.nn as nn
 import torch.optim as optim
 from torch.distributions import Categorical
 from environment.env import Environment, EnvironmentConfig
+from environment.parallel_env import ParallelEnvironment
 import torch.nn as nn
 
 
@@ -112,7 +113,7 @@ class PPOAgent:
         self.memory = PPOMemory()
 
     def choose_action(self, state):
-        state = torch.LongTensor(state).unsqueeze(0)
+        state = torch.as_tensor(state, dtype=torch.long).unsqueeze(0)
 
         with torch.no_grad():
             action_probs, value = self.actor_critic(state)
@@ -122,8 +123,26 @@ class PPOAgent:
 
         return action.item(), action_probs[0][action.item()].item(), value.item()
 
+    def choose_actions(self, states, masks=None):
+        """choose_action for a batch of states in a single forward pass.
+
+        Invalid actions in the optional (batch, n_actions) masks are never sampled.
+        """
+        states = torch.as_tensor(np.asarray(states), dtype=torch.long)
+
+        with torch.no_grad():
+            action_probs, values = self.actor_critic(states)
+            if masks is not None:
+                action_probs = action_probs * torch.as_tensor(masks)
+                action_probs = action_probs / action_probs.sum(-1, keepdim=True)
+
+        actions = Categorical(action_probs).sample()
+        probs = action_probs.gather(1, actions.unsqueeze(1)).squeeze(1)
+
+        return actions.numpy(), probs.numpy(), values.squeeze(1).numpy()
+
     def learn(self):
-        states = torch.LongTensor(np.array(self.memory.states))
+        states = torch.as_tensor(np.array(self.memory.states), dtype=torch.long)
         actions = torch.LongTensor(np.array(self.memory.actions))
         old_probs = torch.FloatTensor(np.array(self.memory.probs))
         values = torch.FloatTensor(np.array(self.memory.values))
@@ -177,9 +196,9 @@ class PPOAgent:
 
 def train():
     # env = gym.make('CartPole-v1', render_mode=None)
-    config = EnvironmentConfig()
+    config = EnvironmentConfig(observation_mode="grid")
     env = Environment(config)
-    input_dim = len(env.observation())
+    input_dim = config.size
     n_actions = len(env.int_to_action)
 
     agent = PPOAgent(input_dim=input_dim, n_actions=n_actions)
@@ -192,7 +211,7 @@ def train():
         episode_reward = 0
 
         for step in range(max_steps):
-            action, prob, value = agent.choose_action(state)
+            action, prob, value = agent.choose_action(state["grid"])
             next_state, reward, terminated, truncated, _ = env.step(action)
             done = terminated or truncated
 
@@ -203,7 +222,7 @@ def train():
 
             state = next_state
             episode_reward += reward
-            agent.memory.store(state, action, reward, prob, value, done)
+            agent.memory.store(state["grid"], action, reward, prob, value, done)
 
             if done:
                 break
@@ -222,7 +241,7 @@ def train():
 
 
 def run(agent):
-    env = Environment()
+    env = Environment(EnvironmentConfig(observation_mode="grid"))
     obs = env.reset()
     done = False
 
@@ -231,7 +250,7 @@ def run(agent):
         obs, info = env.reset()
         done = False
         while not done:
-            action, prob, value = agent.choose_action(obs)
+            action, prob, value = agent.choose_action(obs["grid"])
             obs, reward, terminated, truncated, _ = env.step(action)
             done = terminated or truncated
             env.render()
@@ -239,6 +258,22 @@ def run(agent):
     env.close()
 
 
+def run_population(agent, n_episodes=10):
+    """Drive every creature with the same policy, one batch per step."""
+    env = ParallelEnvironment()
+
+    for _ in range(n_episodes):
+        obs, infos = env.reset()
+        while env.agents:
+            actions, probs, values = agent.choose_actions(
+                obs["grid"], infos["action_mask"]
+            )
+            obs, rewards, terminations, truncations, infos = env.step(actions)
+        env.render()
+
+    env.close()
+
+
 if __name__ == "__main__":
     agent = train()
     run(agent)
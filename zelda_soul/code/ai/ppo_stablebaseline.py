@@ -1,15 +1,19 @@
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_util import make_vec_env
 from stable_baselines3.common.env_checker import check_env
+from stable_baselines3.common.vec_env import DummyVecEnv
 from environment.env import Environment, EnvironmentConfig
+from environment.shm_vec_env import SharedMemoryVecEnv
 
 
-def train(model=None, total_timesteps=1000000):
+def train(model=None, total_timesteps=1000000, n_envs=1):
     env = Environment()
     check_env(env, warn=True, skip_render_check=True)
     # Wrap the environment to be compatible with Stable-Baselines3
     # For vectorized environments, use `make_vec_env` if training on multiple instances.
-    env = make_vec_env(Environment, n_envs=1)
+    # Several instances run in worker processes that share observation memory.
+    vec_env_cls = SharedMemoryVecEnv if n_envs > 1 else DummyVecEnv
+    env = make_vec_env(Environment, n_envs=n_envs, vec_env_cls=vec_env_cls)
 
     # Initialize PPO agent
     if not model:
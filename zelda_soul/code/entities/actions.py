@@ -1,6 +1,8 @@
 from typing import TYPE_CHECKING, Tuple, List, Dict, Union, Optional, TypeAlias
 import random
+import numpy as np
 from environment.pathfinder import Pathfinder
+from .genome import GENOME_BITS, GENOME_KEYS, crossover
 
 if TYPE_CHECKING:
     from ..environment.env import Environment
@@ -20,12 +22,7 @@ class Action:
         current_x, current_y = c.location
         target_x, target_y = target_location
         # check out of bounds
-        if (
-            0 <= target_x < env.config.size
-            and 0 <= target_y < env.config.size
-            and env.grid[target_y][target_x] == "-1"
-            and c.stats.energy > 0
-        ):
+        if env.grid.is_empty(target_x, target_y) and c.stats.energy > 0:
             # check distance
             distance = abs(target_x - current_x) + abs(target_y - current_y)
             if distance <= c.stats.move_speed:
@@ -93,7 +90,9 @@ class Action:
         if not valid_cells or not partner or c.stats.energy < c.stats.max_energy / 2:
             return False
         child_genome = self._mix_genomes(c, partner)
-        child = env._create_creature(location=valid_cells[0], genome=child_genome)
+        (child,) = env.spawn_many(
+            "creature", 1, locations=[valid_cells[0]], genomes=[child_genome]
+        )
         c.stats.energy = c.stats.energy / 2  # reduced energy
         c.status.reproduced += 1
         return child
@@ -111,16 +110,10 @@ class Action:
             "reproduce": "reproduce with another creature",
         }
 
-    def _mix_genomes(self, a: "Creature", b: "Creature"):
-        child_genome = {}
-        a_genome = a.genome
-        b_genome = b.genome
-        for key in a_genome.keys():
-            child_genome[key] = []
-            for i in range(len(a_genome[key])):
-                gene = a_genome[key][i] if random.random() < 0.5 else b_genome[key][i]
-                child_genome[key].append(gene)
-        return child_genome
+    def _mix_genomes(self, a: "Creature", b: "Creature") -> np.ndarray:
+        """Uniform crossover of the parents' packed genomes."""
+        mask = [random.getrandbits(GENOME_BITS) for _ in GENOME_KEYS]
+        return crossover(a.table.genome[a.slot], b.table.genome[b.slot], mask=mask)
 
     def receive_damage(self, c: "Creature", damage: int) -> bool:
         actual_damage = max(damage - c.stats.resistance, 0)
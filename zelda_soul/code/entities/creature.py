@@ -1,29 +1,74 @@
+import random
+import numpy as np
 from typing import TYPE_CHECKING, Tuple, List, Dict, Union, Optional, TypeAlias
 from .stats import Stats, Genome, CreatureStat, Status
+from .table import CreatureTable, StatsView, StatusView
 from .actions import Action
 
 
 class Creature:
+    """Thin handle on a creature's slot in a CreatureTable.
+
+    stats, status and genome read and write through to the table. A creature
+    built without a table gets a private one, and attach() moves it into a
+    shared table such as Environment.creatures.
+    """
+
+    __slots__ = ("id", "handle", "location", "table", "slot", "stats", "status")
 
     def __init__(
         self,
         id: str,
         location: Tuple[int, int],
         type: str,
-        genome: Optional[Genome] = None,
+        genome: Optional[Union[Genome, np.ndarray]] = None,
+        table: Optional[CreatureTable] = None,
+        rng: random.Random = random,
     ):
         self.id = id
+        self.handle = -1  # integer handle, assigned by the environment
         self.location = location
 
-        stats = CreatureStat(genome)
-        self.genome: Genome = stats.get_genome()
-        self.stats: Stats = stats.get_stats()
-        self.status: Status = stats.get_status()
+        stats = CreatureStat(genome, rng)
+        self.table = table if table is not None else CreatureTable(capacity=1)
+        self.slot = self.table.allocate()
+        self.table.set_base(self.slot, stats.get_base(), stats.hp, stats.energy)
+        self.table.set_genome(self.slot, stats.get_genome())
+        self._bind()
+
+    @classmethod
+    def from_slot(
+        cls, id: str, location: Tuple[int, int], table: CreatureTable, slot: int
+    ) -> "Creature":
+        """Wrap an existing table row without regenerating genome or stats."""
+        creature = cls.__new__(cls)
+        creature.id = id
+        creature.handle = -1
+        creature.location = location
+        creature.table = table
+        creature.slot = slot
+        creature._bind()
+        return creature
+
+    def _bind(self) -> None:
+        self.stats: Stats = StatsView(self.table, self.slot)
+        self.status: Status = StatusView(self.table, self.slot)
+
+    @property
+    def genome(self) -> Genome:
+        return self.table.get_genome(self.slot)
 
+    def attach(self, table: CreatureTable) -> None:
+        """Move this creature's row into another table."""
+        slot = table.allocate()
+        table.copy_slot(slot, self.table, self.slot)
+        self.table.release(self.slot)
+        self.table, self.slot = table, slot
+        self._bind()
 
 
 if __name__ == "__main__":
-    creature = Creature(id="c1")
+    creature = Creature(id="c1", location=(0, 0), type="creature")
     print(creature.stats)
     print(creature.genome)
     print(creature.status)
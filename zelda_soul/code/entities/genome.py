@@ -0,0 +1,83 @@
+import numpy as np
+from typing import Dict, List, Optional, TypeAlias, Union
+
+Genome: TypeAlias = Dict[str, List[int]]
+
+GENOME_BITS = 10
+
+GENOME_KEYS = [
+    "max_hp",
+    "max_energy",
+    "move_speed",
+    "resistance",
+    "attack_speed",
+    "attack_range",
+    "notice_range",
+    "lifespan",
+    "harvest",
+    "chill",
+    "attack",
+    "heal",
+    "tendency_to_help",
+    "reproduction_rate",
+]
+
+# A packed genome is one integer per genome key with gene i in bit i, so a
+# population of n genomes is an (n, len(GENOME_KEYS)) uint16 array.
+PACKED_DTYPE = np.uint16
+GENE_MASK = (1 << GENOME_BITS) - 1
+_BIT_VALUES = 1 << np.arange(GENOME_BITS)
+
+
+def pack(genome: Union[Genome, np.ndarray]) -> np.ndarray:
+    """Packed copy of a dict genome; packed genomes are returned as they are."""
+    if isinstance(genome, np.ndarray):
+        return genome
+    bits = np.array([genome[key] for key in GENOME_KEYS])
+    return (bits @ _BIT_VALUES).astype(PACKED_DTYPE)
+
+
+def unpack(packed: np.ndarray) -> Genome:
+    bits = (packed[:, None] >> np.arange(GENOME_BITS)) & 1
+    return dict(zip(GENOME_KEYS, bits.tolist()))
+
+
+def gene_sums(packed: np.ndarray) -> np.ndarray:
+    """Number of set genes per key, by popcount, for one or many genomes."""
+    return np.bitwise_count(packed).astype(np.int32)
+
+
+def random_genomes(
+    count: int, rng: np.random.Generator, n_genes: int = len(GENOME_KEYS)
+) -> np.ndarray:
+    """`count` genomes, each with `n_genes` genes set at distinct random bits."""
+    n_bits = len(GENOME_KEYS) * GENOME_BITS
+    bits = np.argpartition(rng.random((count, n_bits)), n_genes - 1, axis=1)
+    bits = bits[:, :n_genes]
+    values = (1 << (bits % GENOME_BITS)).astype(PACKED_DTYPE)
+    packed = np.zeros((count, len(GENOME_KEYS)), dtype=PACKED_DTYPE)
+    np.bitwise_or.at(packed, (np.arange(count)[:, None], bits // GENOME_BITS), values)
+    return packed
+
+
+def crossover(
+    a: np.ndarray,
+    b: np.ndarray,
+    rng: Optional[np.random.Generator] = None,
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Uniform crossover: each gene from `a` where `mask` is set, else from `b`.
+
+    Works on single genomes or whole populations. Without a mask one is drawn
+    from `rng`, giving every gene an even chance from either parent.
+    """
+    if mask is None:
+        mask = rng.integers(0, GENE_MASK + 1, size=np.shape(a), dtype=PACKED_DTYPE)
+    mask = np.asarray(mask, dtype=PACKED_DTYPE)
+    return (a & mask) | (b & ~mask & GENE_MASK)
+
+
+def mutate(packed: np.ndarray, rate: float, rng: np.random.Generator) -> np.ndarray:
+    """Flip every gene of one or many genomes independently with chance `rate`."""
+    flips = rng.random(np.shape(packed) + (GENOME_BITS,)) < rate
+    return packed ^ (flips @ _BIT_VALUES).astype(PACKED_DTYPE)
@@ -2,16 +2,18 @@ from dataclasses import dataclass
 from typing import Tuple, Dict
 
 
-@dataclass
+@dataclass(slots=True)
 class ResourceStat:
     hp: int
 
 
+@dataclass(slots=True)
 class ResourceStatus:
     deleted: bool = False  # resource depleted
 
 
 class Resource:
+    __slots__ = ("id", "handle", "type", "location", "stats", "status")
 
     def __init__(
         self,
@@ -21,6 +23,7 @@ class Resource:
         hp: int = 100,
     ) -> None:
         self.id = id
+        self.handle = -1  # integer handle, assigned by the environment
         self.type = type
         self.location = location
         self.stats = ResourceStat(hp=hp)
@@ -1,13 +1,14 @@
 import random
-from dataclasses import dataclass
+import numpy as np
+from dataclasses import dataclass, fields
 from typing import TYPE_CHECKING, Tuple, List, Dict, Union, Optional, TypeAlias
 
-Genome: TypeAlias = Dict[str, List[int]]
+from .genome import GENOME_BITS, GENOME_KEYS, Genome, gene_sums, pack
 
-GENOME_BITS = 10
+INIT_STAT_POINT = 20
 
 
-@dataclass
+@dataclass(slots=True)
 class Stats:
     # Base stats
     hp: int
@@ -36,7 +37,7 @@ class Stats:
     reproduction_rate: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Status:
     # achivement
     lifespan: int = 0  # how many steps before die
@@ -52,64 +53,164 @@ class Status:
     deleted: bool = False  # is creature dead
 
 
-GENOME_KEYS = [
-    "max_hp",
-    "max_energy",
-    "move_speed",
-    "resistance",
-    "attack_speed",
-    "attack_range",
-    "notice_range",
-    "lifespan",
-    "harvest",
-    "chill",
-    "attack",
-    "heal",
-    "tendency_to_help",
-    "reproduction_rate",
-]
+STATUS_FIELDS = tuple(field.name for field in fields(Status))
+
+# the only stats that change during a creature's life
+MUTABLE_STAT_FIELDS = ("hp", "energy")
+BASE_STAT_FIELDS = tuple(
+    field.name for field in fields(Stats) if field.name not in MUTABLE_STAT_FIELDS
+)
+_STAT_TYPES = {field.name: field.type for field in fields(Stats)}
+
+
+@dataclass(frozen=True, slots=True)
+class BaseStats:
+    """The genome-determined part of Stats, shared by identical genomes.
+
+    Records are interned by base_stats() and never change; `index` is their
+    position in BASE_STATS and in the arrays of base_columns().
+    """
+
+    index: int
+    attack: int
+    heal: int
+    max_hp: int
+    max_energy: int
+    move_speed: int
+    resistance: float
+    attack_speed: float
+    attack_range: int
+    notice_range: int
+    lifespan: int
+    harvest: int
+    chill: int
+    tendency_to_help: float
+    reproduction_rate: float
+
+
+# Records are never evicted, as tables and snapshots keep their indices for
+# as long as they live. The registry grows by one record, about 0.5 KiB with
+# its column rows, per distinct tuple of gene sums ever seen in the process:
+# little for a running world, but mutation in long evolution runs keeps
+# finding new tuples, some 50 MB per 100k of them.
+BASE_STATS: List[BaseStats] = []
+_BASE_BY_SUMS: Dict[Tuple[int, ...], BaseStats] = {}
+_BASE_COLUMNS = {
+    name: np.zeros(0, np.float64 if _STAT_TYPES[name] is float else np.int32)
+    for name in BASE_STAT_FIELDS
+}
+
+
+def base_stats(sums: Tuple[int, ...]) -> BaseStats:
+    """The shared BaseStats of genomes with these per-key gene sums.
+
+    Sums range over 0..GENOME_BITS per key, and a population only ever
+    reaches a small part of that, so every record is built once.
+    """
+    base = _BASE_BY_SUMS.get(sums)
+    if base is not None:
+        return base
+    values = {key: total + 1 for key, total in zip(GENOME_KEYS, sums)}
+    values["max_hp"] += INIT_STAT_POINT
+    values["max_energy"] += INIT_STAT_POINT
+    base = BaseStats(
+        index=len(BASE_STATS),
+        **{name: _STAT_TYPES[name](values[name]) for name in BASE_STAT_FIELDS},
+    )
+    _register_base(base)
+    _BASE_BY_SUMS[sums] = base
+    return base
+
+
+def _register_base(base: BaseStats) -> None:
+    """Add `base` to BASE_STATS and the columns, doubling them when full."""
+    if base.index == len(_BASE_COLUMNS["max_hp"]):
+        capacity = max(2 * base.index, 64)
+        for name, column in _BASE_COLUMNS.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: len(column)] = column
+            _BASE_COLUMNS[name] = grown
+    for name, column in _BASE_COLUMNS.items():
+        column[base.index] = getattr(base, name)
+    BASE_STATS.append(base)
+
+
+def base_columns() -> Dict[str, np.ndarray]:
+    """BASE_STATS as one array per field, indexed by BaseStats.index.
+
+    The arrays are replaced as records are added, look them up again rather
+    than keeping them.
+    """
+    return _BASE_COLUMNS
+
+
+def base_indices(packed: np.ndarray) -> np.ndarray:
+    """BaseStats.index for each of many packed genomes."""
+    sums = gene_sums(packed).reshape(-1, len(GENOME_KEYS))
+    unique, inverse = np.unique(sums, axis=0, return_inverse=True)
+    indices = np.array(
+        [base_stats(tuple(row)).index for row in unique.tolist()], dtype=np.int32
+    )
+    return indices[inverse.reshape(-1)].reshape(np.shape(packed)[:-1])
+
+
+def genome_stats(packed: np.ndarray) -> Dict[str, np.ndarray]:
+    """Stats of many packed genomes at once, one array per Stats field."""
+    sums = gene_sums(packed) + 1
+    stats = {key: sums[..., i] for i, key in enumerate(GENOME_KEYS)}
+    stats["hp"] = np.full(sums.shape[:-1], INIT_STAT_POINT, dtype=np.int32)
+    stats["energy"] = np.full(sums.shape[:-1], INIT_STAT_POINT, dtype=np.int32)
+    stats["max_hp"] = stats["max_hp"] + INIT_STAT_POINT
+    stats["max_energy"] = stats["max_energy"] + INIT_STAT_POINT
+    return stats
 
 
 class CreatureStat:
-    def __init__(self, genome: Optional[Genome] = None):
-        self.genome = genome if genome else self._initialize_genome(GENOME_BITS)
-        self.stats = self._calculate_stats(self.genome)
+    def __init__(
+        self,
+        genome: Optional[Union[Genome, np.ndarray]] = None,
+        rng: random.Random = random,
+    ):
+        self.rng = rng
+        # packed, see entities.genome
+        self.genome = (
+            pack(genome) if genome is not None else self._initialize_genome(GENOME_BITS)
+        )
+        self.base = base_stats(tuple(gene_sums(self.genome).tolist()))
+        self.hp = INIT_STAT_POINT
+        self.energy = INIT_STAT_POINT
         self.status = Status()
 
+    @property
+    def stats(self) -> Stats:
+        """A full Stats record of the shared base stats and own hp and energy."""
+        values = {name: getattr(self.base, name) for name in BASE_STAT_FIELDS}
+        return Stats(hp=self.hp, energy=self.energy, **values)
+
     def get_stats(self) -> Stats:
         return self.stats
 
-    def get_genome(self) -> Genome:
+    def get_base(self) -> BaseStats:
+        return self.base
+
+    def get_genome(self) -> np.ndarray:
         return self.genome
 
     def get_status(self) -> Status:
         return self.status
 
-    def _calculate_stats(self, genome: Genome) -> Stats:
-        """Calculate creature stats from genome sums."""
-        genome_sums = {key: sum(genome[key]) + 1 for key in GENOME_KEYS}
-        init_stat_point = 20
-        genome_sums["hp"] = init_stat_point
-        genome_sums["energy"] = init_stat_point
-        genome_sums["max_hp"] += init_stat_point
-        genome_sums["max_energy"] += init_stat_point
-
-        stats = Stats(**genome_sums)
-
-        return stats
-
-    def _initialize_genome(self, n_bits) -> Genome:
-        new_genome = {key: [0] * n_bits for key in GENOME_KEYS}
+    def _initialize_genome(self, n_bits) -> np.ndarray:
+        new_genome = np.zeros(len(GENOME_KEYS), dtype=np.uint16)
         remaining_points = len(GENOME_KEYS)
 
         # Then distribute remaining points randomly
         if remaining_points > 0:
             available_positions = [
-                (key, i) for key in GENOME_KEYS for i in range(n_bits)
+                (key, i) for key in range(len(GENOME_KEYS)) for i in range(n_bits)
             ]
 
-            for key, idx in random.sample(available_positions, remaining_points):
-                new_genome[key][idx] = 1
+            for key, idx in self.rng.sample(available_positions, remaining_points):
+                new_genome[key] |= 1 << idx
 
         return new_genome
 
@@ -0,0 +1,274 @@
+import numpy as np
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Union
+
+from .genome import GENOME_KEYS, PACKED_DTYPE, Genome, pack, unpack
+from .stats import (
+    BASE_STAT_FIELDS,
+    BASE_STATS,
+    MUTABLE_STAT_FIELDS,
+    STATUS_FIELDS,
+    INIT_STAT_POINT,
+    BaseStats,
+    Stats,
+    base_columns,
+    base_indices,
+)
+
+STAT_FIELDS = tuple(field.name for field in fields(Stats))
+# Action.reproduce halves energy
+STAT_DTYPES = {"hp": np.int32, "energy": np.float64}
+STATUS_INDEX = {name: i for i, name in enumerate(STATUS_FIELDS)}
+
+
+def rebuild_base(genome: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """CreatureTable.base for these genomes in this process's BASE_STATS.
+
+    BaseStats indices are only meaningful in the process that registered
+    them, so pickled tables and snapshots leave `base` out and derive it
+    again from the genomes when loaded. Inactive slots get 0.
+    """
+    base = np.zeros(len(active), dtype=np.int32)
+    slots = np.flatnonzero(active)
+    if len(slots):
+        base[slots] = base_indices(genome[slots])
+    return base
+
+
+class CreatureTable:
+    """Columnar storage for creature stats, status counters and genomes.
+
+    Every creature owns one slot. hp and energy are one array each in
+    `columns`; the rest of its stats is fixed by the genome and lives in a
+    BaseStats record shared with identical genomes, referenced by index
+    from `base`. The status counters are one (capacity, n_status) block and
+    genomes one (capacity, n_keys) block of packed genomes (see
+    entities.genome). Creature, StatsView and StatusView read and write
+    through to a slot, while population-wide updates run directly on the
+    arrays, see stat().
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = 0
+        self.columns = {name: np.zeros(0, dtype) for name, dtype in STAT_DTYPES.items()}
+        self.status = np.zeros((0, len(STATUS_FIELDS)), dtype=np.int32)
+        self.genome = np.zeros((0, len(GENOME_KEYS)), dtype=PACKED_DTYPE)
+        self.base = np.zeros(0, dtype=np.int32)
+        self.active = np.zeros(0, dtype=bool)
+        self.free: List[int] = []
+        self._grow(capacity)
+
+    def _grow(self, capacity: int) -> None:
+        def grow(array):
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[: len(array)] = array
+            return grown
+
+        self.columns = {name: grow(column) for name, column in self.columns.items()}
+        self.status = grow(self.status)
+        self.genome = grow(self.genome)
+        self.base = grow(self.base)
+        self.active = grow(self.active)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["base"]  # indices into this process's BASE_STATS
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.base = rebuild_base(self.genome, self.active)
+
+    def __len__(self) -> int:
+        return self.capacity - len(self.free)
+
+    def allocate(self) -> int:
+        if not self.free:
+            self._grow(max(2 * self.capacity, 1))
+        slot = self.free.pop()
+        self.active[slot] = True
+        self.status[slot] = 0
+        return slot
+
+    def release(self, slot: int) -> None:
+        self.active[slot] = False
+        self.free.append(slot)
+
+    def clear(self) -> None:
+        self.active.fill(False)
+        self.free = list(range(self.capacity - 1, -1, -1))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "columns": {name: column.copy() for name, column in self.columns.items()},
+            "status": self.status.copy(),
+            "genome": self.genome.copy(),
+            "base": self.base.copy(),
+            "active": self.active.copy(),
+            "free": list(self.free),
+        }
+
+    def copy(self) -> "CreatureTable":
+        table = CreatureTable.__new__(CreatureTable)
+        table.capacity = self.capacity
+        table.columns = {name: column.copy() for name, column in self.columns.items()}
+        table.status = self.status.copy()
+        table.genome = self.genome.copy()
+        table.base = self.base.copy()
+        table.active = self.active.copy()
+        table.free = list(self.free)
+        return table
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        if len(state["active"]) != self.capacity:
+            self.capacity = 0
+            self.columns = {name: column[:0] for name, column in self.columns.items()}
+            self.status, self.genome = self.status[:0], self.genome[:0]
+            self.base, self.active = self.base[:0], self.active[:0]
+            self._grow(len(state["active"]))
+        for name, column in self.columns.items():
+            np.copyto(column, state["columns"][name])
+        np.copyto(self.status, state["status"])
+        np.copyto(self.genome, state["genome"])
+        np.copyto(self.base, state["base"])
+        np.copyto(self.active, state["active"])
+        self.free = list(state["free"])
+
+    def set_base(self, slot: int, base: BaseStats, hp: int, energy: float) -> None:
+        self.base[slot] = base.index
+        self.columns["hp"][slot] = hp
+        self.columns["energy"][slot] = energy
+
+    def get_base(self, slot: int) -> BaseStats:
+        return BASE_STATS[self.base[slot]]
+
+    def set_genome(self, slot: int, genome: Union[Genome, np.ndarray]) -> None:
+        self.genome[slot] = pack(genome)
+
+    def get_genome(self, slot: int) -> Genome:
+        return unpack(self.genome[slot])
+
+    def set_genomes(self, slots: np.ndarray, packed: np.ndarray) -> None:
+        """Set the genomes of many slots and derive their stats from them.
+
+        hp and energy start over, as for a newborn creature.
+        """
+        self.genome[slots] = packed
+        self.base[slots] = base_indices(packed)
+        self.columns["hp"][slots] = INIT_STAT_POINT
+        self.columns["energy"][slots] = INIT_STAT_POINT
+
+    def stat(self, name: str, slots: np.ndarray) -> np.ndarray:
+        """One stat of many slots, gathered from the shared base stats if fixed."""
+        if name in self.columns:
+            return self.columns[name][slots]
+        return base_columns()[name][self.base[slots]]
+
+    def copy_slot(self, slot: int, other: "CreatureTable", other_slot: int) -> None:
+        """Copy one creature's row from another table."""
+        for name, column in self.columns.items():
+            column[slot] = other.columns[name][other_slot]
+        self.status[slot] = other.status[other_slot]
+        self.genome[slot] = other.genome[other_slot]
+        self.base[slot] = other.base[other_slot]
+
+    def _slots(self, slots: Optional[np.ndarray]) -> np.ndarray:
+        return np.flatnonzero(self.active) if slots is None else slots
+
+    # population-wide updates, each mirroring its single creature Action
+
+    def damage(self, slots: np.ndarray, damage: np.ndarray) -> None:
+        """Action.receive_damage for many creatures at once."""
+        hp = self.columns["hp"]
+        actual = np.maximum(damage - self.stat("resistance", slots), 0)
+        hp[slots] = np.maximum(hp[slots] - actual, 0)
+
+    def heal(self, slots: np.ndarray, amount: np.ndarray) -> None:
+        hp = self.columns["hp"]
+        hp[slots] = np.minimum(hp[slots] + amount, self.stat("max_hp", slots))
+
+    def decay(self, amount: int = 1, slots: Optional[np.ndarray] = None) -> None:
+        slots = self._slots(slots)
+        self.columns["hp"][slots] -= amount
+
+    def regen_energy(self, slots: Optional[np.ndarray] = None) -> None:
+        """Action.chill for every given (default: every active) creature."""
+        slots = self._slots(slots)
+        energy = self.columns["energy"]
+        energy[slots] = np.minimum(
+            energy[slots] + self.stat("chill", slots),
+            self.stat("max_energy", slots),
+        )
+        self.status[slots, STATUS_INDEX["chill"]] += 1
+
+    def dead(self) -> np.ndarray:
+        """Active slots with no hp left."""
+        return np.flatnonzero(self.active & (self.columns["hp"] <= 0))
+
+
+class _SlotView:
+    __slots__ = ("_table", "_slot")
+
+    def __init__(self, table: CreatureTable, slot: int) -> None:
+        self._table = table
+        self._slot = slot
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+
+def _stat_property(name: str) -> property:
+    def get(self):
+        return self._table.columns[name][self._slot].item()
+
+    def set(self, value):
+        self._table.columns[name][self._slot] = value
+
+    return property(get, set)
+
+
+def _base_property(name: str) -> property:
+    def get(self):
+        return getattr(BASE_STATS[self._table.base[self._slot]], name)
+
+    def set(self, value):
+        raise AttributeError(f"{name} is fixed by the genome")
+
+    return property(get, set)
+
+
+def _status_property(index: int, cast: type) -> property:
+    def get(self):
+        return cast(self._table.status[self._slot, index])
+
+    def set(self, value):
+        self._table.status[self._slot, index] = value
+
+    return property(get, set)
+
+
+class StatsView(_SlotView):
+    """Stats-compatible view of a creature's row in a CreatureTable."""
+
+    __slots__ = ()
+    _fields = STAT_FIELDS
+
+
+class StatusView(_SlotView):
+    """Status-compatible view of a creature's row in a CreatureTable."""
+
+    __slots__ = ()
+    _fields = STATUS_FIELDS
+
+
+for _name in MUTABLE_STAT_FIELDS:
+    setattr(StatsView, _name, _stat_property(_name))
+for _name in BASE_STAT_FIELDS:
+    setattr(StatsView, _name, _base_property(_name))
+for _name, _index in STATUS_INDEX.items():
+    setattr(
+        StatusView, _name, _status_property(_index, bool if _name == "deleted" else int)
+    )
@@ -0,0 +1,94 @@
+import heapq
+from typing import List, Optional, Sequence
+
+
+class AStar:
+    """A* over a 4-connected, row-major grid of flat cell indices.
+
+    A cell (x, y) is the node y * width + x. Each search keeps its own open
+    heap, closed set and parent pointers, so one instance serves any number
+    of grids and queries. Among open nodes of equal f the one nearer the
+    goal is expanded first, then the lower index, which keeps searches
+    short on open ground and their paths deterministic.
+
+    `queries`, `expanded` (over all queries) and `last_expanded` count the
+    work done, a node being expanded when its neighbours are generated.
+    """
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.expanded = 0
+        self.last_expanded = 0
+
+    def search(
+        self,
+        passable: Sequence[int],
+        width: int,
+        start: int,
+        goal: int,
+        reach: int = 0,
+    ) -> Optional[List[int]]:
+        """Shortest path from `start` to a cell within `reach` of `goal`.
+
+        `passable` is truthy for the cells that may be entered, e.g.
+        `(grid.ids == EMPTY).tobytes()`; the start cell itself need not be.
+        With reach > 0 the search ends next to the goal, whose cell may then
+        be blocked (reach is in Chebyshev distance, so 1 includes diagonal
+        neighbours). Returns the cells after `start` up to and including the
+        last one, [] when start is already in reach, or None when no cell
+        in reach can be entered.
+        """
+        height = len(passable) // width
+        gx, gy = goal % width, goal // width
+
+        def heuristic(node: int) -> int:
+            # exact on open ground: steps to enter the square around the goal
+            y, x = divmod(node, width)
+            return max(abs(x - gx) - reach, 0) + max(abs(y - gy) - reach, 0)
+
+        h = heuristic(start)
+        open_heap = [(h, h, start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        expanded = 0
+        found = None
+
+        while open_heap:
+            _, h, node = heapq.heappop(open_heap)
+            if node in closed:
+                continue
+            if h == 0:
+                found = node
+                break
+            closed.add(node)
+            expanded += 1
+
+            y, x = divmod(node, width)
+            cost = g_score[node] + 1
+            for neighbour, inside in (
+                (node - 1, x > 0),
+                (node + 1, x < width - 1),
+                (node - width, y > 0),
+                (node + width, y < height - 1),
+            ):
+                if not inside or neighbour in closed or not passable[neighbour]:
+                    continue
+                if cost < g_score.get(neighbour, cost + 1):
+                    g_score[neighbour] = cost
+                    came_from[neighbour] = node
+                    h = heuristic(neighbour)
+                    heapq.heappush(open_heap, (cost + h, h, neighbour))
+
+        self.queries += 1
+        self.expanded += expanded
+        self.last_expanded = expanded
+        if found is None:
+            return None
+
+        path = []
+        while found != start:
+            path.append(found)
+            found = came_from[found]
+        path.reverse()
+        return path
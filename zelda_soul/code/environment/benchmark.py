@@ -0,0 +1,288 @@
+"""Throughput benchmark for Environment.
+
+Sweeps EnvironmentConfig.size, n_creature and n_resource and, for each
+world, reports steps/sec, the time per call of step, env_step, reset
+(generated, and restored from a SnapshotPool) and observation, the split
+of step time into action resolution, deletion and observation, and peak
+traced memory. It also measures the bytes per entity object at 100k
+entities. Results are written as JSON so runs from different commits can
+be compared:
+
+    python -m environment.benchmark --output bench.json
+    python -m environment.benchmark --sizes 8 64 --creatures 4 --steps 500
+
+Runs headless, without a display or GPU.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # pathfinder imports pygame
+
+import argparse
+import functools
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import asdict, fields, replace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from entities.creature import Creature
+from entities.resource import Resource
+from entities.stats import Stats, Status
+from entities.table import CreatureTable
+from environment.env import Environment, EnvironmentConfig
+
+SIZES = [8, 32, 128, 512]
+CREATURES = [4, 64, 1024]
+RESOURCES = [8, 128, 2048]
+MAX_FILL = 0.5  # skip worlds where entities would cover more of the map
+POOL_SIZE = 8  # pre-built worlds for the pooled reset timing
+
+
+def _timed(
+    function: Callable, phase: str, timings: Dict[str, float]
+) -> Callable[..., Any]:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[phase] += time.perf_counter() - start
+
+    return wrapper
+
+
+def _instrument(env: Environment) -> Dict[str, float]:
+    """Time the phases of env.step by wrapping the methods it calls."""
+    timings: Dict[str, float] = defaultdict(float)
+    env.actions.set_action = _timed(env.actions.set_action, "action", timings)
+    env.remove_dead = _timed(env.remove_dead, "deletion", timings)
+    env.observation = _timed(env.observation, "observation", timings)
+    return timings
+
+
+def _per_call(seconds: float, calls: int) -> float:
+    return seconds / calls * 1e6 if calls else 0.0
+
+
+def run_config(
+    config: EnvironmentConfig, steps: int = 1000, seed: int = 0
+) -> Dict[str, Any]:
+    """Benchmark one world; times are microseconds per call."""
+    random.seed(seed)
+    actions = np.random.default_rng(seed).integers(9, size=steps).tolist()
+
+    start = time.perf_counter()
+    env = Environment(config)
+    build = time.perf_counter() - start
+
+    # step, with its phases
+    env.reset()
+    timings = _instrument(env)
+    reset_time = 0.0
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            # reset() builds an observation too, only count the step ones
+            observation_time = timings["observation"]
+            reset_start = time.perf_counter()
+            env.reset()
+            reset_time += time.perf_counter() - reset_start
+            timings["observation"] = observation_time
+    step_time = time.perf_counter() - start - reset_time
+
+    # the other entry points on their own
+    env = Environment(config)
+    env.reset()
+    calls = max(steps // 10, 1)
+    start = time.perf_counter()
+    for _ in range(calls):
+        env.env_step()
+    env_step_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        env.observation(copy=False)
+    observation_only = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        env.reset()
+    reset_only = time.perf_counter() - start
+
+    # unseeded resets restoring one of the worlds pre-built by a SnapshotPool
+    start = time.perf_counter()
+    env = Environment(replace(config, snapshot_pool=POOL_SIZE))
+    pool_build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        env.reset()
+    pooled_reset = time.perf_counter() - start
+
+    return {
+        "config": asdict(config),
+        "steps": steps,
+        "steps_per_sec": steps / step_time,
+        "build_us": build * 1e6,
+        "step_us": _per_call(step_time, steps),
+        "phases_us": {
+            "action": _per_call(timings["action"], steps),
+            "deletion": _per_call(timings["deletion"], steps),
+            "observation": _per_call(timings["observation"], steps),
+        },
+        "env_step_us": _per_call(env_step_time, calls),
+        "observation_us": _per_call(observation_only, calls),
+        "reset_us": _per_call(reset_only, calls),
+        "pooled_reset_us": _per_call(pooled_reset, calls),
+        "pool_build_us": pool_build * 1e6,
+        "peak_memory_bytes": peak_memory(config, steps=min(steps, 100), seed=seed),
+    }
+
+
+def peak_memory(config: EnvironmentConfig, steps: int = 100, seed: int = 0) -> int:
+    """Peak traced allocation while building, resetting and stepping a world."""
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        env = Environment(config)
+        env.reset()
+        for action in np.random.default_rng(seed).integers(9, size=steps).tolist():
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def entity_memory(count: int = 100_000) -> Dict[str, float]:
+    """Traced bytes per object, ids and locations included, over `count` objects.
+
+    Creatures are wrappers over an existing CreatureTable, whose per-slot
+    cost is reported separately as creature_table.
+    """
+
+    def per_object(make: Callable[[int], Any]) -> float:
+        tracemalloc.start()
+        try:
+            objects = [make(i) for i in range(count)]
+            traced = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return (traced - sys.getsizeof(objects)) / count
+
+    tracemalloc.start()
+    try:
+        table = CreatureTable(capacity=count)
+        table_bytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    stats = list(range(len(fields(Stats))))
+    return {
+        "resource": per_object(lambda i: Resource(f"r{i}", (i, i), "edible", 20)),
+        "creature": per_object(lambda i: Creature.from_slot(f"c{i}", (i, i), table, i)),
+        "creature_table": table_bytes / count,
+        "stats": per_object(lambda i: Stats(*stats)),
+        "status": per_object(lambda i: Status()),
+    }
+
+
+def sweep(
+    sizes: List[int] = SIZES,
+    creatures: List[int] = CREATURES,
+    resources: List[int] = RESOURCES,
+    steps: int = 1000,
+    seed: int = 0,
+    observation_mode: str = "onehot",
+) -> List[Dict[str, Any]]:
+    results = []
+    for size, n_creature, n_resource in itertools.product(sizes, creatures, resources):
+        if n_creature + n_resource > MAX_FILL * size * size:
+            continue
+        config = EnvironmentConfig(
+            size=size,
+            n_creature=n_creature,
+            n_resource=n_resource,
+            observation_mode=observation_mode,
+        )
+        result = run_config(config, steps=steps, seed=seed)
+        results.append(result)
+        print(
+            f"size={size:<5} creatures={n_creature:<5} resources={n_resource:<5} "
+            f"{result['steps_per_sec']:>10.0f} steps/s  "
+            f"step {result['step_us']:8.1f}us  "
+            f"obs {result['observation_us']:8.1f}us  "
+            f"env_step {result['env_step_us']:8.1f}us  "
+            f"reset {result['reset_us']:9.1f}us  "
+            f"pooled {result['pooled_reset_us']:9.1f}us  "
+            f"peak {result['peak_memory_bytes'] / 2**20:7.1f}MiB"
+        )
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--creatures", type=int, nargs="+", default=CREATURES)
+    parser.add_argument("--resources", type=int, nargs="+", default=RESOURCES)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--observation-mode", default="onehot")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument(
+        "--entity-count",
+        type=int,
+        default=100_000,
+        help="objects per type for the bytes per entity measure, 0 to skip",
+    )
+    args = parser.parse_args(argv)
+
+    results = sweep(
+        args.sizes,
+        args.creatures,
+        args.resources,
+        steps=args.steps,
+        seed=args.seed,
+        observation_mode=args.observation_mode,
+    )
+    report = {
+        "commit": _commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.entity_count:
+        report["bytes_per_entity"] = entity_memory(args.entity_count)
+        for name, size in report["bytes_per_entity"].items():
+            print(f"{name:<15} {size:8.1f} bytes per entity")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
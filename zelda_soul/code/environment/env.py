@@ -2,20 +2,32 @@ from math import inf
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, replace
 import random
 import copy
+import functools
+import sys
 from typing import Dict, List, Tuple, Optional, Union, TypeAlias, Any
 
 
 from entities.creature import Creature
 from entities.resource import Resource
+from entities.stats import STATUS_FIELDS, Genome
+from entities.table import CreatureTable
 from environment.pathfinder import Pathfinder
+from environment.scheduler import ACTION_SPEED, Scheduler
+from environment.snapshot import SnapshotPool, WorldSnapshot
+from environment.grid import (
+    Grid,
+    TYPE_EMPTY,
+    TYPE_PLAYER,
+    TYPE_CREATURE,
+    TYPE_RESOURCE,
+)
 from ai.simple_ai import SimpleAI
 from entities.actions import Action
 from settings import MAX_STEP_COUNT
 
-GridType: TypeAlias = List[List[str]]
 Location: TypeAlias = Tuple[int, int]
 
 
@@ -25,6 +37,38 @@ class EnvironmentConfig:
     n_creature: int = 4
     n_resource: int = 8
     resource_hp: int = 20
+    # return views of the observation buffers from step/reset instead of copies
+    zero_copy_observation: bool = False
+    # worlds generated up front and restored by unseeded resets instead of
+    # generating a new one, and kept by seed for reset(seed=...) when a seed
+    # comes back; 0 generates every world
+    snapshot_pool: int = 0
+    # "onehot": the whole map one-hot encoded, grows with size * size
+    # "egocentric": a view_size x view_size one-hot window around the player
+    # plus type counts pooled over overview_block x overview_block tiles
+    # "grid": the (size, size) uint8 type codes, for embedding policies, or
+    # with grid_channels a channels-first (n_types, size, size) one-hot
+    # "entities": (dx, dy, type, hp, energy) rows of the n_entities entities
+    # nearest to the player and a mask of the filled rows, found through the
+    # grid's overview_block tiles
+    observation_mode: str = "onehot"
+    view_size: int = 5
+    overview_block: int = 8
+    grid_channels: bool = False
+    n_entities: int = 16
+
+
+OBSERVATION_MODES = ("onehot", "egocentric", "grid", "entities")
+
+# 8-neighbourhood offsets, as used by Pathfinder.get_adjacent_entities
+_NEIGHBOUR_DX = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+_NEIGHBOUR_DY = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+_MOVES = {
+    "move_up": (0, -1),
+    "move_down": (0, 1),
+    "move_left": (-1, 0),
+    "move_right": (1, 0),
+}
 
 
 class Environment(gym.Env):
@@ -32,10 +76,11 @@ class Environment(gym.Env):
 
     def __init__(
         self,
+        config: Optional[EnvironmentConfig] = None,
         render_mode: str = "console",
     ) -> None:
         super(Environment, self).__init__()
-        self.config = EnvironmentConfig()
+        self.config = config if config else EnvironmentConfig()
         self.n_types = 4  # 0 for empty, 1 for player, 2 for creature, 3 for resource
 
         self.render_mode = render_mode
@@ -62,18 +107,35 @@ class Environment(gym.Env):
 
         self.action_space = spaces.Discrete(len(self.int_to_action))
 
-        self.grid: GridType = [
-            ["-1"] * self.config.size for _ in range(self.config.size)
-        ]
+        mode = self.config.observation_mode
+        if mode not in OBSERVATION_MODES:
+            raise ValueError(
+                f"unknown observation_mode {mode!r}, expected one of "
+                + ", ".join(OBSERVATION_MODES)
+            )
+        tiled = mode in ("egocentric", "entities")
+        self.grid = Grid(self.config.size, self.config.overview_block if tiled else 0)
+        # world generation draws from rng, seeded from the global random state
+        self.rng = random.Random(random.getrandbits(64))
         self.pathfinder = Pathfinder()
         self.ai = SimpleAI()
-
-        self.entities: Dict[str, Union[Creature, Resource]] = {}
+        self.scheduler = Scheduler()
+
+        self.creatures = CreatureTable()
+        # entities are keyed by dense integer handles, the "c1"/"r3" string ids
+        # are aliases kept for display, logging and the persona prompts
+        self.entities: Dict[int, Union[Creature, Resource]] = {}
+        self.aliases: Dict[str, int] = {}
+        self.kinds = np.zeros(64, dtype=np.uint8)  # cell type code per handle
+        # handle of the creature in each creature table slot, for turning the
+        # table's vectorised queries back into entities
+        self.slot_handles = np.full(64, -1, dtype=np.int32)
         self.action_history = []
         self.actions = Action()
 
         self.resource_counter = 0
         self.creature_counter = 0
+        self.handle_counter = 0
 
         self.state = None
         self.reward = None
@@ -83,61 +145,285 @@ class Environment(gym.Env):
 
         self.populate()
 
-        onehot = spaces.MultiBinary(
-            self.config.size * self.config.size * self.n_types + len(self.int_to_action)
-        )
+        self.pool = None
+        if self.config.snapshot_pool:
+            builder_config = replace(self.config, snapshot_pool=0)
+            self.pool = SnapshotPool(
+                functools.partial(Environment, builder_config),
+                self.config.snapshot_pool,
+            )
 
+        n_actions = len(self.int_to_action)
         continuous = spaces.Box(
             low=0,
             high=inf,
-            shape=(len(self.player.status.__dataclass_fields__) + 2,),
+            shape=(len(STATUS_FIELDS) + 2,),
             dtype=np.int32,
         )
 
-        self.observation_space = spaces.Dict(
-            {
-                "onehot": onehot,
-                "continuous": continuous,
+        if self.config.observation_mode == "onehot":
+            onehot = spaces.MultiBinary(
+                self.config.size * self.config.size * self.n_types + n_actions
+            )
+            self.observation_space = spaces.Dict(
+                {
+                    "onehot": onehot,
+                    "continuous": continuous,
+                }
+            )
+        elif self.config.observation_mode == "grid":
+            size = self.config.size
+            if self.config.grid_channels:
+                grid = spaces.Box(
+                    low=0, high=1, shape=(self.n_types, size, size), dtype=np.uint8
+                )
+            else:
+                grid = spaces.Box(
+                    low=0, high=self.n_types - 1, shape=(size, size), dtype=np.uint8
+                )
+            self.observation_space = spaces.Dict(
+                {
+                    "grid": grid,
+                    "continuous": continuous,
+                }
+            )
+        elif self.config.observation_mode == "entities":
+            n_entities = self.config.n_entities
+            self.observation_space = spaces.Dict(
+                {
+                    "entities": spaces.Box(
+                        low=-inf, high=inf, shape=(n_entities, 5), dtype=np.int32
+                    ),
+                    "entity_mask": spaces.MultiBinary(n_entities),
+                    "continuous": continuous,
+                }
+            )
+        else:
+            # fixed size whatever the map size
+            view = self.config.view_size
+            block = self.config.overview_block
+            n_blocks = len(self.grid.counts)
+            self.observation_space = spaces.Dict(
+                {
+                    "local": spaces.MultiBinary(view * view * self.n_types + n_actions),
+                    "overview": spaces.Box(
+                        low=0,
+                        high=block * block,
+                        shape=(n_blocks, n_blocks, self.n_types),
+                        dtype=np.int32,
+                    ),
+                    "continuous": continuous,
+                }
+            )
+
+        # observation buffers, rewritten in place by observation()
+        self.bind_observation_buffers(
+            **{
+                key: np.zeros(space.shape, dtype=space.dtype)
+                for key, space in self.observation_space.spaces.items()
             }
         )
+        self._allocate_scratch()
+
+    def _allocate_scratch(self) -> None:
+        n_cells = self.config.size * self.config.size
+        self._cell_offsets = np.arange(n_cells, dtype=np.intp) * self.n_types
+        self._onehot_index = np.empty(n_cells, dtype=np.intp)
+        view = self.config.view_size
+        self._local_types = np.empty((view, view), dtype=np.uint8)
+        if self.config.grid_channels:
+            size = self.config.size
+            self._type_codes = np.arange(self.n_types).reshape(-1, 1, 1)
+            self._channels = np.empty((self.n_types, size, size), dtype=bool)
+
+    def bind_observation_buffers(self, **buffers: np.ndarray) -> None:
+        """Make observation() write into caller-owned arrays, e.g. shared memory.
+
+        Takes one array per observation_space key.
+        """
+        self.buffers = buffers
+        self._action_buffer = None  # the grid mode has no last action part
+        n_actions = len(self.int_to_action)
+        for key in ("onehot", "local"):
+            if key in buffers:
+                # map part and last action part of the flat one-hot vector
+                self._grid_buffer = buffers[key][:-n_actions]
+                self._action_buffer = buffers[key][-n_actions:]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # copies would turn the buffer views into arrays of their own, they
+        # are bound again to the copied buffers instead
+        state = self.__dict__.copy()
+        state.pop("_grid_buffer", None)
+        state.pop("_action_buffer", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.bind_observation_buffers(**self.buffers)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Environment":
+        clone = type(self).__new__(type(self))
+        memo[id(self)] = clone
+        clone.__setstate__(copy.deepcopy(self.__getstate__(), memo))
+        return clone
+
+    def type_grid(self) -> np.ndarray:
+        """Cell type codes with the current player marked."""
+        types = self.grid.types.copy()
+        x, y = self.player.location
+        types[y, x] = TYPE_PLAYER
+        return types
+
+    def observation(self, action_int=0, copy=True):
+        """Write the observation into the env buffers.
+
+        With copy=False the returned arrays are views of the buffers and are
+        overwritten by the next call.
+        """
+        if self.config.observation_mode == "onehot":
+            self._onehot_observation()
+        elif self.config.observation_mode == "grid":
+            self._grid_observation()
+        elif self.config.observation_mode == "entities":
+            self._entity_observation()
+        else:
+            self._egocentric_observation()
 
-    def observation(self, action_int=0):
-        def convert_string(s):
-            if s.startswith("c"):
-                return 2
-            elif s.startswith("r"):
-                return 3
-            else:
-                return 0
-
-        contiuous_list = []
-        one_hot_list = []
-        self.output_grid = copy.deepcopy(self.grid)
-        for y, row in enumerate(self.grid):
-            for x, s in enumerate(row):
-                if s == self.player.id:
-                    self.output_grid[y][x] = 1
-                else:
-                    self.output_grid[y][x] = convert_string(s)
-                onehot = [0, 0, 0, 0]
-                onehot[int(self.output_grid[y][x])] = 1
-                one_hot_list.extend(onehot)
-
-        one_hot_action = [0] * len(self.int_to_action)
-        one_hot_action[action_int] = 1
-        one_hot_list.extend(one_hot_action)
-        # add stats
+        if self._action_buffer is not None:
+            self._action_buffer.fill(0)
+            self._action_buffer[action_int] = 1
 
-        for key, value in asdict(self.player.status).items():
-            contiuous_list.append(value)
+        # add stats
+        continuous = self.buffers["continuous"]
+        n_status = len(STATUS_FIELDS)
+        slot = self.player.slot
+        continuous[:n_status] = self.creatures.status[slot]
+        continuous[n_status] = self.creatures.columns["hp"][slot]
+        continuous[n_status + 1] = self.creatures.columns["energy"][slot]
+
+        if copy:
+            return {key: buffer.copy() for key, buffer in self.buffers.items()}
+        return dict(self.buffers)
+
+    def _onehot_observation(self) -> None:
+        size = self.config.size
+        x, y = self.player.location
+        player_cell = y * size + x
+
+        np.add(self._cell_offsets, self.grid.types.ravel(), out=self._onehot_index)
+        self._onehot_index[player_cell] = self._cell_offsets[player_cell] + TYPE_PLAYER
+        self._grid_buffer.fill(0)
+        self._grid_buffer[self._onehot_index] = 1
+
+    def _grid_observation(self) -> None:
+        grid = self.buffers["grid"]
+        x, y = self.player.location
+        if self.config.grid_channels:
+            np.equal(self._type_codes, self.grid.types, out=self._channels)
+            grid[...] = self._channels
+            grid[:, y, x] = 0
+            grid[TYPE_PLAYER, y, x] = 1
+        else:
+            np.copyto(grid, self.grid.types)
+            grid[y, x] = TYPE_PLAYER
+
+    def _entity_observation(self) -> None:
+        rows = self.buffers["entities"]
+        mask = self.buffers["entity_mask"]
+        x, y = self.player.location
+        cells = self.grid.nearest(self.player.location, self.config.n_entities)
+        handles = self.grid.ids.ravel()[cells]
+        n = len(cells)
+
+        rows.fill(0)
+        rows[:n, 0] = cells % self.config.size - x
+        rows[:n, 1] = cells // self.config.size - y
+        rows[:n, 2] = self.kinds[handles]
+        for row, handle in enumerate(handles.tolist()):
+            entity = self.entities[handle]
+            if rows[row, 2] == TYPE_CREATURE:
+                rows[row, 3] = self.creatures.columns["hp"][entity.slot]
+                rows[row, 4] = self.creatures.columns["energy"][entity.slot]
+            else:
+                rows[row, 3] = entity.stats.hp
+        mask.fill(0)
+        mask[:n] = 1
+
+    def _egocentric_observation(self) -> None:
+        """One-hot view_size window centred on the player, cells off the map
+        all zero, and the grid's pooled type counts as the overview."""
+        size = self.config.size
+        radius = self.config.view_size // 2
+        x, y = self.player.location
+
+        local = self._local_types
+        local.fill(self.n_types)  # off the map
+        x0, y0 = max(x - radius, 0), max(y - radius, 0)
+        x1, y1 = min(x + radius + 1, size), min(y + radius + 1, size)
+        local[y0 - y + radius : y1 - y + radius, x0 - x + radius : x1 - x + radius] = (
+            self.grid.types[y0:y1, x0:x1]
+        )
+        local[radius, radius] = TYPE_PLAYER
+
+        cells = np.flatnonzero(local < self.n_types)
+        self._grid_buffer.fill(0)
+        self._grid_buffer[cells * self.n_types + local.ravel()[cells]] = 1
+
+        overview = self.buffers["overview"]
+        np.copyto(overview, self.grid.counts)
+        block = self.config.overview_block
+        tile = overview[y // block, x // block]
+        tile[TYPE_CREATURE] -= 1
+        tile[TYPE_PLAYER] += 1
+
+    def action_mask_batch(self, locations: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """Valid-action mask, (n, n_actions) bool, for creatures at `locations`.
+
+        An action is valid when Action.set_action could succeed: moves need an
+        empty cell, attack/reproduce an adjacent creature, harvest an adjacent
+        resource, and everything needs energy (reproduce half of max_energy).
+        heal_other never gets a target from step(), so it is never valid. A
+        creature with no valid action gets an all-True row, as maskable
+        policies need at least one choice.
+        """
+        size = self.config.size
+        locations = np.asarray(locations, dtype=np.intp).reshape(-1, 2)
+        slots = np.asarray(slots, dtype=np.intp)
+        xs, ys = locations[:, 0] + 1, locations[:, 1] + 1
+
+        # cell types around each creature, out of bounds counts as occupied
+        padded = np.full((size + 2, size + 2), 255, dtype=np.uint8)
+        padded[1:-1, 1:-1] = self.grid.types
+        neighbours = padded[ys[:, None] + _NEIGHBOUR_DY, xs[:, None] + _NEIGHBOUR_DX]
+        near_creature = (neighbours == TYPE_CREATURE).any(axis=1)
+        near_resource = (neighbours == TYPE_RESOURCE).any(axis=1)
+        near_empty = (neighbours == TYPE_EMPTY).any(axis=1)
+
+        energy = self.creatures.columns["energy"][slots]
+        has_energy = energy > 0
+        valid = {
+            "attack": near_creature & has_energy,
+            "heal_self": has_energy,
+            "heal_other": np.zeros(len(slots), dtype=bool),
+            "harvest": near_resource & has_energy,
+            "reproduce": near_creature
+            & near_empty
+            & (energy >= self.creatures.stat("max_energy", slots) / 2),
+        }
+        for action, (dx, dy) in _MOVES.items():
+            valid[action] = (padded[ys + dy, xs + dx] == TYPE_EMPTY) & has_energy
 
-        contiuous_list.append(self.player.stats.hp)
-        contiuous_list.append(self.player.stats.energy)
+        masks = np.stack(
+            [valid[action] for action in self.int_to_action.values()], axis=1
+        )
+        masks[~masks.any(axis=1)] = True
+        return masks
 
-        return {
-            "onehot": np.array(one_hot_list, dtype=np.int8),
-            "continuous": np.array(contiuous_list, dtype=np.int32),
-        }
+    def action_masks(self) -> np.ndarray:
+        """Valid-action mask of the current player, for maskable PPO."""
+        player = self.player
+        return self.action_mask_batch([player.location], [player.slot])[0]
 
     def add_creatures(self, creatures: List[Creature]) -> bool:
         for creature in creatures:
@@ -153,27 +439,76 @@ class Environment(gym.Env):
         self,
     ) -> None:
         # Add creatures
-        for _ in range(self.config.n_creature):
-            self._create_creature()
+        self.spawn_many("creature", self.config.n_creature)
 
         # Add resources
-        for _ in range(self.config.n_resource):
-            self._create_resource(hp=self.config.resource_hp)
+        self.spawn_many("resource", self.config.n_resource, hp=self.config.resource_hp)
 
-        self.player = self.entities["c1"]  # set default player
+        self.player = self.entities[self.aliases["c1"]]  # set default player
+
+    def spawn_many(
+        self,
+        kind: str,
+        count: int,
+        locations: Optional[List[Location]] = None,
+        genomes: Optional[Union[List[Genome], np.ndarray]] = None,
+        hp: Optional[int] = None,
+    ) -> List[Union[Creature, Resource]]:
+        """Create `count` creatures or resources at distinct cells.
+
+        `genomes` holds one dict or packed genome per creature, or is an
+        (count, len(GENOME_KEYS)) array of packed genomes.
+
+        Without explicit locations the cells are drawn from the grid's free-cell
+        index without replacement, so fewer than `count` entities are created
+        when the grid fills up.
+        """
+        if locations is None:
+            locations = self.grid.sample_empty(count, self.rng)
+
+        spawned = []
+        for i, location in enumerate(locations):
+            if kind == "creature":
+                genome = genomes[i] if genomes is not None else None
+                entity = self._create_creature(location=location, genome=genome)
+            elif kind == "resource":
+                entity = self._create_resource(location=location, hp=hp)
+            else:
+                raise ValueError(f"Unknown entity kind: {kind}")
+            spawned.append(entity)
+        return spawned
+
+    def _register(self, entity: Union[Creature, Resource], cell_type: int) -> None:
+        handle = self.handle_counter
+        self.handle_counter += 1
+        if handle >= len(self.kinds):
+            self.kinds = np.resize(self.kinds, 2 * len(self.kinds))
+        self.kinds[handle] = cell_type
+
+        entity.handle = handle
+        self.entities[handle] = entity
+        self.aliases[entity.id] = handle
+        self.grid.place(handle, cell_type, entity.location)
+        if cell_type == TYPE_CREATURE:
+            if entity.slot >= len(self.slot_handles):
+                self.slot_handles = np.resize(
+                    self.slot_handles, max(2 * len(self.slot_handles), entity.slot + 1)
+                )
+            self.slot_handles[entity.slot] = handle
+            self.scheduler.add(handle)
 
     def _generate_creature_id(self) -> str:
         self.creature_counter += 1
-        return f"c{self.creature_counter}"
+        return sys.intern(f"c{self.creature_counter}")
 
     def _generate_resource_id(self) -> str:
         self.resource_counter += 1
-        return f"r{self.resource_counter}"
+        return sys.intern(f"r{self.resource_counter}")
 
     def _create_creature(
         self,
         location: Optional[Location] = None,
-        genome: Optional[Dict[str, List[int]]] = None,
+        genome: Optional[Union[Genome, np.ndarray]] = None,
         creature: Optional[Creature] = None,
     ) -> Optional[Creature]:
         if not location:
@@ -188,11 +523,15 @@ class Environment(gym.Env):
                 location=location,
                 type="creature",
                 genome=genome,
+                table=self.creatures,
+                rng=self.rng,
             )
+        else:
+            creature.id = id
+            if creature.table is not self.creatures:
+                creature.attach(self.creatures)
 
-        self.entities[id] = creature
-        x, y = creature.location
-        self.grid[y][x] = id
+        self._register(creature, TYPE_CREATURE)
         return creature
 
     def _create_resource(
@@ -212,128 +551,308 @@ class Environment(gym.Env):
                 id=id,
                 location=location,
                 type="edible",
-                hp=hp if hp else random.randint(50, 150),
+                hp=hp if hp else self.rng.randint(50, 150),
             )
 
-        self.entities[id] = resource
-        x, y = location
-        self.grid[y][x] = id
+        self._register(resource, TYPE_RESOURCE)
         return resource
 
-    def get_entity(self, entity_id: str) -> Optional[Union[Creature, Resource]]:
-        return self.entities.get(entity_id)
+    def get_entity(self, handle: int) -> Optional[Union[Creature, Resource]]:
+        return self.entities.get(handle)
+
+    def resolve(self, alias: str) -> Optional[int]:
+        """Handle of the entity with the given string id."""
+        return self.aliases.get(alias)
 
     def render(self) -> None:
         # Print column numbers
-        self.observation()
         if self.render_mode == "console":
             # print("" + " ".join([f"{i:2}" for i in range(self.config.size)]))
-            for idx, row in enumerate(self.output_grid):
+            for idx, row in enumerate(self.type_grid().tolist()):
                 # Print row number and row content
                 print(" ".join([str(cell) for cell in row]))
                 # print(f"{idx:2} " + " ".join([str(cell) for cell in row]))
 
-    def mark_delete(self, entity_id: str):
-        entity = self.get_entity(entity_id)
+    def mark_delete(self, handle: int):
+        entity = self.get_entity(handle)
         entity.status.deleted = True
 
-    def remove_deleted(self, deleted_ids) -> bool:
-        for id in deleted_ids:
-            x, y = self.entities[id].location
-            self.grid[y][x] = "-1"
-            del self.entities[id]
+    def remove_deleted(self, deleted_handles) -> bool:
+        for handle in deleted_handles:
+            entity = self.entities.pop(handle)
+            del self.aliases[entity.id]
+            self.grid.remove(entity.location)
+            if self.kinds[handle] == TYPE_CREATURE:
+                self.creatures.release(entity.slot)
+                self.scheduler.remove(handle)
         return True
 
     def env_step(self) -> None:
-        # Process all entities
-        for entity_id, entity in list(self.entities.items()):
-            # Apply decay
-            if isinstance(entity, Creature):
-                # entity.stats.hp -= 1
-                pass
+        # Wake the creatures due this tick, resources never act
+        for handle in self.scheduler.due():
+            entity = self.entities[handle]
+            if entity.status.deleted:
+                continue
             # Remove if dead
             if entity.stats.hp <= 0:
-                self.mark_delete(entity_id)
+                self.mark_delete(handle)
                 continue
 
             # Run AI
-            if isinstance(entity, Creature):
-                action, target_id, success = self.ai.step(entity, self)
-                self.action_history.append((entity_id, action, target_id, success))
-
-    def set_current_player(self, id):
-        self.player = self.entities[id]
-
-    def reset(self, seed=None, options=None):
-        self.grid = [["-1"] * self.config.size for _ in range(self.config.size)]
+            action, target, success = self.ai.step(entity, self)
+            self.action_history.append((handle, action, target, success))
+            speed = getattr(entity.stats, ACTION_SPEED.get(action, "move_speed"))
+            self.scheduler.add(handle, self.scheduler.interval(speed))
+        self.scheduler.tick += 1
+
+    def set_current_player(self, handle: Union[int, str]):
+        if isinstance(handle, str):
+            handle = self.resolve(handle)
+        self.player = self.entities[handle]
+
+    def clear(self) -> None:
+        """Empty the world and restart the id and handle counters."""
+        self.grid.clear()
+        self.creatures.clear()
+        self.scheduler.clear()
         self.entities = {}
+        self.aliases = {}
         self.creature_counter = 0
         self.resource_counter = 0
+        self.handle_counter = 0
         self.step_count = 0
         self.action_history = []
 
-        self.populate()
+    def snapshot(self) -> WorldSnapshot:
+        entities = list(self.entities.values())
+        creature_slots = [getattr(entity, "slot", -1) for entity in entities]
+        return WorldSnapshot(
+            grid=self.grid.snapshot(),
+            table=self.creatures.snapshot(),
+            kinds=self.kinds[: self.handle_counter].copy(),
+            handles=np.array(list(self.entities), dtype=np.int32),
+            aliases=tuple(entity.id for entity in entities),
+            locations=np.array(
+                [entity.location for entity in entities], dtype=np.int32
+            ).reshape(-1, 2),
+            slots=np.array(creature_slots, dtype=np.int32),
+            hp=np.array(
+                [
+                    entity.stats.hp if slot < 0 else 0
+                    for entity, slot in zip(entities, creature_slots)
+                ],
+                dtype=np.int32,
+            ),
+            deleted=np.array(
+                [entity.status.deleted for entity in entities], dtype=bool
+            ),
+            player=self.player.handle,
+            counters=(
+                self.creature_counter,
+                self.resource_counter,
+                self.handle_counter,
+            ),
+            step_count=self.step_count,
+        )
+
+    def restore(self, snapshot: WorldSnapshot) -> None:
+        """Load a world saved by snapshot(), copying its arrays into place.
+
+        Snapshots do not keep the schedule, every creature is due on the next
+        env_step.
+        """
+        self.grid.restore(snapshot.grid)
+        self.creatures.restore(snapshot.table)
+        self.scheduler.clear()
+        n_handles = len(snapshot.kinds)
+        if n_handles > len(self.kinds):
+            self.kinds = np.zeros(2 * n_handles, dtype=np.uint8)
+        self.kinds[:n_handles] = snapshot.kinds
+        if self.creatures.capacity > len(self.slot_handles):
+            self.slot_handles = np.full(self.creatures.capacity, -1, dtype=np.int32)
+        is_creature = snapshot.slots >= 0
+        self.slot_handles[snapshot.slots[is_creature]] = snapshot.handles[is_creature]
+
+        self.entities = {}
+        self.aliases = {}
+        for handle, alias, location, slot, hp, deleted in zip(
+            snapshot.handles.tolist(),
+            snapshot.aliases,
+            map(tuple, snapshot.locations.tolist()),
+            snapshot.slots.tolist(),
+            snapshot.hp.tolist(),
+            snapshot.deleted.tolist(),
+        ):
+            if slot >= 0:
+                entity = Creature.from_slot(alias, location, self.creatures, slot)
+            else:
+                entity = Resource(id=alias, location=location, type="edible", hp=hp)
+                if deleted:
+                    entity.status.deleted = True
+            entity.handle = handle
+            self.entities[handle] = entity
+            self.aliases[alias] = handle
+            if slot >= 0:
+                self.scheduler.add(handle)
+
+        self.creature_counter, self.resource_counter, self.handle_counter = (
+            snapshot.counters
+        )
+        self.step_count = snapshot.step_count
+        self.action_history = []
+        self.player = self.entities[snapshot.player]
+
+    def fork(self) -> "Environment":
+        """Independent copy of the current world, e.g. for lookahead planners.
+
+        The copy shares config, spaces and the snapshot pool, and gets
+        pathfinding and action helpers of its own, with empty caches, so
+        that its queries leave the parent's cached paths, flow fields and
+        clusters alone. Grid and creature table arrays are copied and the
+        entity wrappers rebuilt on top of them, nothing is deep-copied. For repeated rollouts from one
+        state, snapshot() once and restore() in place instead.
+        """
+        clone = copy.copy(self)
+        clone.grid = self.grid.copy()
+        clone.creatures = self.creatures.copy()
+        clone.kinds = self.kinds.copy()
+        clone.slot_handles = self.slot_handles.copy()
+        clone.rng = copy.copy(self.rng)
+        clone.scheduler = self.scheduler.copy()
+        clone.pathfinder = Pathfinder(self.pathfinder.cache_size)
+        clone.ai = SimpleAI()
+        clone.actions = Action()
+        clone.bind_observation_buffers(
+            **{key: np.zeros_like(buffer) for key, buffer in self.buffers.items()}
+        )
+        clone._allocate_scratch()
+        clone.action_history = list(self.action_history)
+
+        clone.entities = {}
+        clone.aliases = dict(self.aliases)
+        for handle, entity in self.entities.items():
+            if self.kinds[handle] == TYPE_CREATURE:
+                twin = Creature.from_slot(
+                    entity.id, entity.location, clone.creatures, entity.slot
+                )
+            else:
+                twin = Resource(
+                    entity.id, entity.location, entity.type, entity.stats.hp
+                )
+                twin.status.deleted = entity.status.deleted
+            twin.handle = handle
+            clone.entities[handle] = twin
+        clone.player = clone.entities[self.player.handle]
+        return clone
+
+    def reset(self, seed=None, options=None):
+        if self.pool is not None:
+            if seed is None:
+                self.restore(self.pool.pick(self.rng))
+            else:
+                self.restore(self.pool.get(seed))
+        else:
+            self.clear()
+            self.populate()
 
         # [ value for all location]
-        return self.observation(), {"info": "Environement reset"}
+        return (
+            self.observation(copy=not self.config.zero_copy_observation),
+            {"info": "Environement reset", "action_mask": self.action_masks()},
+        )
+
+    def act(self, creature: Creature, action) -> Tuple[Any, float]:
+        """Run one action for `creature` and remove whatever it killed.
+
+        The action target is the first adjacent creature (attack, reproduce)
+        or resource (harvest). Returns the action result and its reward.
+        """
+        target = None
+        action = self.int_to_action[int(action)]
+        handles = self.pathfinder.get_adjacent_entities(creature.location, self)
+
+        kinds = self.kinds[handles].tolist()
+        creatures = [
+            self.entities[handle]
+            for handle, kind in zip(handles, kinds)
+            if kind == TYPE_CREATURE
+        ]
+        resources = [
+            self.entities[handle]
+            for handle, kind in zip(handles, kinds)
+            if kind == TYPE_RESOURCE
+        ]
+
+        if action == "attack" or action == "heal" or action == "reproduce":
+            # find target creature
+            if creatures:
+                target = creatures[0]
+            else:
+                target = None
+
+        elif action == "harvest":
+            # find target resource
+            if resources:
+                target = resources[0]
+            else:
+                target = None
+
+        info, reward = self.actions.set_action(
+            action, c=creature, target=target, env=self
+        )
+
+        self.remove_dead()
+        return info, reward
+
+    def remove_dead(self) -> List[int]:
+        """Remove every entity with no hp left, returning their handles.
+
+        Dead creatures come from one mask over the creature table, only the
+        resources on the grid are looked at one by one.
+        """
+        grid = self.grid
+        resources = grid.ids[grid.types == TYPE_RESOURCE].tolist()
+        deleted = self.slot_handles[self.creatures.dead()].tolist()
+        deleted += [
+            handle for handle in resources if self.entities[handle].stats.hp <= 0
+        ]
+        if deleted:
+            deleted.sort()  # in entity order, as they were found before
+            self.remove_deleted(deleted)
+        return deleted
 
     def step(self, action) -> (Any, Any, Any, Any, Any):
 
         terminated = False
         truncated = False
-        target = None
         next_state = None
         reward = 0
         info = None
         action_int = action
 
         if self.player.stats.hp <= 0:
-            self.mark_delete(self.player.id)
+            self.mark_delete(self.player.handle)
             terminated = True
             reward = -200
         else:
-            action = self.int_to_action[int(action)]
-            target_ids = self.pathfinder.get_adjacent_entities(
-                self.player.location, self
-            )
-
-            entities = [self.get_entity(id) for id in target_ids]
-            creatures = [entity for entity in entities if isinstance(entity, Creature)]
-            resources = [entity for entity in entities if isinstance(entity, Resource)]
-
-            if action == "attack" or action == "heal" or action == "reproduce":
-                # find target creature
-                if creatures:
-                    target = creatures[0]
-                else:
-                    target = None
-
-            elif action == "harvest":
-                # find target resource
-                if resources:
-                    target = resources[0]
-                else:
-                    target = None
-
-            info, reward = self.actions.set_action(
-                action, c=self.player, target=target, env=self
-            )
-
-            # remove entity from environement
-            deleted = [
-                id for id, entity in self.entities.items() if entity.stats.hp <= 0
-            ]
-            if deleted:
-                self.remove_deleted(deleted)
+            info, reward = self.act(self.player, action)
 
         # decay
         self.player.stats.hp -= 1
-        next_state = self.observation(action_int)
+        next_state = self.observation(
+            action_int, copy=not self.config.zero_copy_observation
+        )
         self.step_count += 1
         if self.step_count >= MAX_STEP_COUNT:
             truncated = True
 
-        return next_state, reward, terminated, truncated, {}
+        return (
+            next_state,
+            reward,
+            terminated,
+            truncated,
+            {"action_mask": self.action_masks()},
+        )
 
     def close(self):
         pass
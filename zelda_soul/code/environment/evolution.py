@@ -0,0 +1,359 @@
+"""Headless evolution of creature genomes.
+
+Each island holds a population of packed genomes (see entities.genome) and
+evaluates a generation by giving every genome the player of its own world
+in a VectorEnvironment, one world per individual, played out until every
+world has finished an episode. The player picks actions with odds set by
+its genes (ACTION_GENES), and its fitness is a weighted sum of the Status
+counters it ended with (FITNESS_WEIGHTS). The next generation keeps the
+elite and fills up with tournament-selected parents, uniform crossover and
+bit-flip mutation, all as array ops over the whole population.
+
+Islands evolve in a process pool and, every migration_interval generations,
+send copies of their best genomes to the next island in a ring. Statistics
+of every generation of every island are appended to a JSON lines file as
+soon as they are known:
+
+    python -m environment.evolution --population 4096 --islands 4
+    python -m environment.evolution --generations 20 --output run.jsonl
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # pathfinder imports pygame
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import Manager
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from entities.genome import (
+    GENOME_KEYS,
+    crossover,
+    gene_sums,
+    mutate,
+    random_genomes,
+)
+from entities.stats import STATUS_FIELDS
+from environment.env import EnvironmentConfig
+from environment.vector_env import PLAYER, VectorEnvironment
+
+FITNESS_WEIGHTS = {
+    "lifespan": 1.0,
+    "killed": 20.0,
+    "collected": 10.0,
+    "reproduced": 50.0,
+}
+
+# the genome key whose gene count weighs each action of the player
+ACTION_GENES = {
+    "move_up": "move_speed",
+    "move_down": "move_speed",
+    "move_left": "move_speed",
+    "move_right": "move_speed",
+    "attack": "attack",
+    "heal_self": "heal",
+    "heal_other": "tendency_to_help",
+    "harvest": "harvest",
+    "reproduce": "reproduction_rate",
+}
+
+Record = Dict[str, Any]
+
+
+def _small_world() -> EnvironmentConfig:
+    return EnvironmentConfig(size=8, n_creature=4, n_resource=8)
+
+
+@dataclass
+class EvolutionConfig:
+    population: int = 1024  # genomes per island
+    generations: int = 50
+    islands: int = 1
+    # processes running the islands, 0 runs them one after another in-process
+    workers: int = 0
+    elite: int = 16  # best genomes copied unchanged into the next generation
+    tournament: int = 3
+    mutation_rate: float = 0.005  # chance to flip each gene
+    migration_interval: int = 5  # generations between migrations
+    migrants: int = 8
+    fitness_weights: Dict[str, float] = field(
+        default_factory=lambda: dict(FITNESS_WEIGHTS)
+    )
+    env: EnvironmentConfig = field(default_factory=_small_world)
+    seed: int = 0
+
+
+def fitness(status: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+    """Weighted sum of (n, n_status) Status counters, one value per row."""
+    vector = np.zeros(len(STATUS_FIELDS))
+    for name, weight in weights.items():
+        vector[STATUS_FIELDS.index(name)] = weight
+    return status @ vector
+
+
+def tournament_select(
+    scores: np.ndarray, count: int, size: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Indices of `count` winners of tournaments among `size` random entrants."""
+    entrants = rng.integers(len(scores), size=(count, size))
+    return entrants[np.arange(count), scores[entrants].argmax(axis=1)]
+
+
+def next_generation(
+    genomes: np.ndarray,
+    scores: np.ndarray,
+    config: EvolutionConfig,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Elite first, best to worst, then mutated offspring of tournament winners."""
+    order = np.argsort(-scores, kind="stable")
+    elite = genomes[order[: config.elite]]
+    n_children = len(genomes) - len(elite)
+    a = tournament_select(scores, n_children, config.tournament, rng)
+    b = tournament_select(scores, n_children, config.tournament, rng)
+    children = crossover(genomes[a], genomes[b], rng)
+    children = mutate(children, config.mutation_rate, rng)
+    return np.concatenate([elite, children])
+
+
+def genome_actions(genomes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """One action per genome, each drawn with odds 1 + its ACTION_GENES count."""
+    sums = gene_sums(genomes)
+    weights = 1 + np.stack(
+        [sums[:, GENOME_KEYS.index(key)] for key in ACTION_GENES.values()], axis=1
+    )
+    cumulative = np.cumsum(weights, axis=1)
+    draw = rng.random(len(genomes)) * cumulative[:, -1]
+    return (cumulative <= draw[:, None]).sum(axis=1)
+
+
+class Island:
+    """One population, evolved on its own VectorEnvironment.
+
+    The environment is rebuilt on demand and not pickled, so islands travel
+    cheaply to and from pool workers.
+    """
+
+    def __init__(self, index: int, config: EvolutionConfig) -> None:
+        self.index = index
+        self.config = config
+        self.rng = np.random.default_rng([config.seed, index])
+        self.genomes = random_genomes(config.population, self.rng)
+        self.best = self.genomes[: config.migrants]  # of the last evaluated
+        self.generation = 0
+        self._env: Optional[VectorEnvironment] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_env"] = None
+        return state
+
+    @property
+    def env(self) -> VectorEnvironment:
+        if self._env is None:
+            self._env = VectorEnvironment(len(self.genomes), self.config.env)
+        return self._env
+
+    def evaluate(self) -> np.ndarray:
+        """Status counters each genome ended its episode with, (n, n_status)."""
+        env = self.env
+        n, n_status = len(self.genomes), len(STATUS_FIELDS)
+        env.reset(seed=int(self.rng.integers(2**31)))
+        env.set_player_genomes(self.genomes)
+
+        status = np.zeros((n, n_status), dtype=np.int32)
+        done = np.zeros(n, dtype=bool)
+        while not done.all():
+            actions = genome_actions(env.genome[:, PLAYER], self.rng)
+            _, _, terminated, truncated, infos = env.step(actions)
+            # finished worlds restart with random players, only count the first
+            finished = (terminated | truncated) & ~done
+            if finished.any():
+                final = infos["final_obs"]["continuous"][finished, :n_status]
+                status[finished] = final
+                done |= finished
+        return status
+
+    def step(self) -> Record:
+        """Evaluate the current generation and breed the next one."""
+        start = time.perf_counter()
+        status = self.evaluate()
+        scores = fitness(status, self.config.fitness_weights)
+        record = self._record(status, scores)
+        record["seconds"] = time.perf_counter() - start
+
+        order = np.argsort(-scores, kind="stable")
+        self.best = self.genomes[order[: self.config.migrants]]
+        self.genomes = next_generation(self.genomes, scores, self.config, self.rng)
+        self.generation += 1
+        return record
+
+    def _record(self, status: np.ndarray, scores: np.ndarray) -> Record:
+        sums = gene_sums(self.genomes)
+        return {
+            "island": self.index,
+            "generation": self.generation,
+            "fitness": {
+                "mean": float(scores.mean()),
+                "std": float(scores.std()),
+                "min": float(scores.min()),
+                "max": float(scores.max()),
+            },
+            "status_mean": dict(zip(STATUS_FIELDS, status.mean(axis=0).tolist())),
+            "gene_mean": dict(zip(GENOME_KEYS, sums.mean(axis=0).tolist())),
+            "best_genome": self.genomes[scores.argmax()].tolist(),
+        }
+
+    def immigrate(self, genomes: np.ndarray) -> None:
+        """Replace the last offspring, never the elite, with `genomes`."""
+        if len(genomes):
+            self.genomes[-len(genomes) :] = genomes
+
+
+def _evolve(
+    island: Island, generations: int, report: Callable[[Record], None]
+) -> Island:
+    for _ in range(generations):
+        report(island.step())
+    return island
+
+
+def migrate(islands: List[Island]) -> None:
+    """Ring migration: every island receives the best of the one before it."""
+    best = [island.best.copy() for island in islands]
+    for i, island in enumerate(islands):
+        island.immigrate(best[i - 1])
+
+
+def evolve(config: EvolutionConfig, output: Optional[str] = None) -> List[Island]:
+    """Run config.generations generations on every island.
+
+    Islands run config.migration_interval generations at a time between
+    migrations, and report every generation as soon as it is evaluated:
+    its record is printed and appended to `output` as one JSON line, in the
+    order islands finish them.
+    """
+    islands = [Island(i, config) for i in range(config.islands)]
+    stream = open(output, "a") if output else None
+
+    def write(record: Record) -> None:
+        _report(record)
+        if stream:
+            stream.write(json.dumps(record) + "\n")
+            stream.flush()
+
+    executor = ProcessPoolExecutor(config.workers) if config.workers else None
+    manager = Manager() if executor else None
+    try:
+        done = 0
+        while done < config.generations:
+            generations = min(config.migration_interval, config.generations - done)
+            if executor:
+                islands = _evolve_pool(
+                    executor, manager.Queue(), islands, generations, write
+                )
+            else:
+                islands = [_evolve(island, generations, write) for island in islands]
+            done += generations
+
+            if len(islands) > 1 and done < config.generations:
+                migrate(islands)
+    finally:
+        if executor:
+            executor.shutdown()
+            manager.shutdown()
+        if stream:
+            stream.close()
+    return islands
+
+
+def _evolve_pool(
+    executor: ProcessPoolExecutor,
+    records: "Queue[Record]",
+    islands: List[Island],
+    generations: int,
+    write: Callable[[Record], None],
+) -> List[Island]:
+    """_evolve every island on `executor`, writing records as they arrive."""
+    futures = [
+        executor.submit(_evolve, island, generations, records.put) for island in islands
+    ]
+    pending = len(islands) * generations
+    while pending:
+        try:
+            record = records.get(timeout=0.1)
+        except Empty:
+            if any(future.done() and future.exception() for future in futures):
+                break  # raised below
+            continue
+        write(record)
+        pending -= 1
+    return [future.result() for future in futures]
+
+
+def _report(record: Record) -> None:
+    print(
+        f"island {record['island']:<3} generation {record['generation']:<5} "
+        f"fitness mean {record['fitness']['mean']:8.2f} "
+        f"max {record['fitness']['max']:8.2f}  "
+        f"{record['seconds']:6.2f}s"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    defaults = EvolutionConfig()
+    parser.add_argument("--population", type=int, default=defaults.population)
+    parser.add_argument("--generations", type=int, default=defaults.generations)
+    parser.add_argument("--islands", type=int, default=defaults.islands)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="pool processes, defaults to one per island, 0 to run in-process",
+    )
+    parser.add_argument("--elite", type=int, default=defaults.elite)
+    parser.add_argument("--tournament", type=int, default=defaults.tournament)
+    parser.add_argument("--mutation-rate", type=float, default=defaults.mutation_rate)
+    parser.add_argument(
+        "--migration-interval", type=int, default=defaults.migration_interval
+    )
+    parser.add_argument("--migrants", type=int, default=defaults.migrants)
+    parser.add_argument("--size", type=int, default=defaults.env.size)
+    parser.add_argument("--creatures", type=int, default=defaults.env.n_creature)
+    parser.add_argument("--resources", type=int, default=defaults.env.n_resource)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", default="evolution.jsonl")
+    args = parser.parse_args(argv)
+
+    workers = args.islands if args.workers is None else args.workers
+    config = EvolutionConfig(
+        population=args.population,
+        generations=args.generations,
+        islands=args.islands,
+        workers=workers if args.islands > 1 else 0,
+        elite=args.elite,
+        tournament=args.tournament,
+        mutation_rate=args.mutation_rate,
+        migration_interval=args.migration_interval,
+        migrants=args.migrants,
+        env=EnvironmentConfig(
+            size=args.size, n_creature=args.creatures, n_resource=args.resources
+        ),
+        seed=args.seed,
+    )
+    with open(args.output, "w") as f:
+        f.write(json.dumps({"config": asdict(config)}) + "\n")
+    evolve(config, args.output)
+    print(f"wrote {config.islands * config.generations} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
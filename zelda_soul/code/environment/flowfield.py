@@ -0,0 +1,107 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple, TypeAlias
+
+from environment.grid import EMPTY, TYPE_RESOURCE, Grid
+
+Location: TypeAlias = Tuple[int, int]
+
+UNREACHABLE = -1
+
+
+def wavefront(passable: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """BFS distances over a 4-connected grid, one array op per ring.
+
+    `passable` and `seeds` are (height, width) bool arrays; seeds are at
+    distance 0 and the wave only enters passable cells. Cells it never
+    reaches are UNREACHABLE. Seeds of shape (n, height, width) run n
+    separate waves over the same passable cells at once.
+    """
+    seeds = np.asarray(seeds, dtype=bool)
+    distance = np.full(seeds.shape, UNREACHABLE, dtype=np.int32)
+    distance[seeds] = 0
+    open_cells = passable & ~seeds
+    frontier = seeds.copy()
+    grown = np.empty_like(frontier)
+    ring = 0
+    while frontier.any():
+        ring += 1
+        grown.fill(False)
+        grown[..., 1:, :] |= frontier[..., :-1, :]
+        grown[..., :-1, :] |= frontier[..., 1:, :]
+        grown[..., 1:] |= frontier[..., :-1]
+        grown[..., :-1] |= frontier[..., 1:]
+        grown &= open_cells
+        distance[grown] = ring
+        open_cells &= ~grown
+        frontier, grown = grown, frontier
+    return distance
+
+
+class FlowField:
+    """Steps to get next to one goal cell, from every cell of a Grid.
+
+    The distance map is what a_star_path_finder would return the length of
+    for every start at once, counting only cells of the `blocking` types as
+    obstacles. By default that is resources alone: creatures move every
+    step and would make the field stale at once, so they are stepped around
+    as they are met in next_step instead. The field is rebuilt by refresh()
+    only when a layer it depends on has changed.
+    """
+
+    def __init__(
+        self, goal: Location, blocking: Sequence[int] = (TYPE_RESOURCE,)
+    ) -> None:
+        self.goal = goal
+        self.blocking = tuple(blocking)
+        self.distance: Optional[np.ndarray] = None
+        self.grid: Optional[Grid] = None
+        self.stamps: Tuple[int, ...] = ()
+        self.builds = 0
+
+    def _stamps(self, grid: Grid) -> Tuple[int, ...]:
+        return tuple(grid.type_stamps[cell_type] for cell_type in self.blocking)
+
+    def refresh(self, grid: Grid) -> bool:
+        """Rebuild the field if `grid` or its blocking layers changed."""
+        if self.grid is grid and self.stamps == self._stamps(grid):
+            return False
+
+        passable = ~np.isin(grid.types, self.blocking)
+        # the goal is reached from any cell around it, diagonals included
+        x, y = self.goal
+        seeds = np.zeros_like(passable)
+        seeds[max(y - 1, 0) : y + 2, max(x - 1, 0) : x + 2] = True
+        seeds[y, x] = False
+        seeds &= passable
+
+        self.distance = wavefront(passable, seeds)
+        self.grid = grid
+        self.stamps = self._stamps(grid)
+        self.builds += 1
+        return True
+
+    def next_step(self, location: Location) -> Optional[Location]:
+        """The empty neighbour one step nearer the goal, if there is one.
+
+        Neighbours held by a creature are passed over for the next best
+        one; None once next to the goal, or when stuck or cut off.
+        """
+        grid, distance = self.grid, self.distance
+        x, y = location
+        gx, gy = self.goal
+        if abs(x - gx) <= 1 and abs(y - gy) <= 1:
+            return None
+
+        here = distance[y, x]
+        best, best_distance = None, None
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if not grid.in_bounds(nx, ny):
+                continue
+            step = distance[ny, nx]
+            if step == UNREACHABLE or grid.ids[ny, nx] != EMPTY:
+                continue
+            if here != UNREACHABLE and step >= here:
+                continue
+            if best_distance is None or step < best_distance:
+                best, best_distance = (nx, ny), step
+        return best
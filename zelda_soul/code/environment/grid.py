@@ -0,0 +1,277 @@
+import random
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple, TypeAlias
+
+Location: TypeAlias = Tuple[int, int]
+
+EMPTY = -1  # entity index stored in an empty cell
+
+# cell type codes, shared with the observation encoding
+TYPE_EMPTY = 0
+TYPE_PLAYER = 1
+TYPE_CREATURE = 2
+TYPE_RESOURCE = 3
+N_TYPES = 4
+
+
+class Grid:
+    """Occupancy grid of entity indices with a parallel type layer.
+
+    Both layers are indexed [y, x] so that row-major iteration matches the
+    old list-of-lists layout. Empty cells are also tracked in a swap-remove
+    index (flat cell ids in free[:n_free], each cell's position in free_pos)
+    so sampling an empty cell is O(1).
+
+    With block > 0 the grid also keeps, per block x block tile, the number of
+    cells of each type (counts[by, bx, type]) and the set of occupied cells
+    (tiles[by * n_blocks + bx]), updated on every change, so a pooled
+    overview or a nearest-entity query never needs a full scan.
+
+    Every change also stamps the cells it touches with the new `version`
+    (stamps[cell]), so a result computed at some version, like a cached
+    path, is known to still hold while none of its cells has a later stamp.
+    Likewise type_stamps[type] is the version of the last change to a cell
+    of that type, before or after, for results that depend on one layer.
+    """
+
+    def __init__(self, size: int, block: int = 0) -> None:
+        self.size = size
+        self.block = block
+        self.ids = np.full((size, size), EMPTY, dtype=np.int32)
+        self.types = np.zeros((size, size), dtype=np.uint8)
+        self.free = np.arange(size * size, dtype=np.int32)
+        self.free_pos = np.arange(size * size, dtype=np.int32)  # -1 if occupied
+        self.n_free = size * size
+        self.version = 0
+        self.stamps = np.zeros(size * size, dtype=np.int64)
+        self.type_stamps = [0] * N_TYPES
+        self.counts = None
+        self.tiles: List[Set[int]] = []
+        self.n_blocks = -(-size // block) if block else 0
+        if block:
+            n_blocks = self.n_blocks
+            # cells per tile, the last row and column of tiles may be partial
+            widths = np.diff(np.minimum(np.arange(n_blocks + 1) * block, size))
+            self.tile_cells = np.outer(widths, widths).astype(np.int32)
+            self.counts = np.zeros((n_blocks, n_blocks, N_TYPES), dtype=np.int32)
+            self._reset_counts()
+            self._reset_tiles()
+
+    def _reset_counts(self) -> None:
+        self.counts.fill(0)
+        self.counts[..., TYPE_EMPTY] = self.tile_cells
+
+    def _reset_tiles(self) -> None:
+        self.tiles = [set() for _ in range(self.n_blocks * self.n_blocks)]
+        for cell in np.flatnonzero(self.ids != EMPTY).tolist():
+            self.tiles[self._tile(cell % self.size, cell // self.size)].add(cell)
+
+    def _tile(self, x: int, y: int) -> int:
+        return (y // self.block) * self.n_blocks + x // self.block
+
+    def _count(self, x: int, y: int, old_type: int, new_type: int) -> None:
+        tile = self.counts[y // self.block, x // self.block]
+        tile[old_type] -= 1
+        tile[new_type] += 1
+        cells = self.tiles[self._tile(x, y)]
+        if new_type == TYPE_EMPTY:
+            cells.discard(y * self.size + x)
+        else:
+            cells.add(y * self.size + x)
+
+    def _stamp(self, types: Tuple[int, ...], *cells: int) -> None:
+        self.version += 1
+        for cell in cells:
+            self.stamps[cell] = self.version
+        for cell_type in types:
+            self.type_stamps[cell_type] = self.version
+
+    def _stamp_all(self) -> None:
+        self.version += 1
+        self.stamps.fill(self.version)
+        self.type_stamps = [self.version] * N_TYPES
+
+    def clear(self) -> None:
+        self._stamp_all()
+        self.ids.fill(EMPTY)
+        self.types.fill(TYPE_EMPTY)
+        self.free[:] = np.arange(self.size * self.size)
+        self.free_pos[:] = self.free
+        self.n_free = self.size * self.size
+        if self.block:
+            self._reset_counts()
+            self._reset_tiles()
+
+    def _take(self, cell: int) -> None:
+        pos = self.free_pos[cell]
+        if pos < 0:
+            return
+        last = self.free[self.n_free - 1]
+        self.free[pos] = last
+        self.free_pos[last] = pos
+        self.free_pos[cell] = -1
+        self.n_free -= 1
+
+    def _give(self, cell: int) -> None:
+        if self.free_pos[cell] >= 0:
+            return
+        self.free[self.n_free] = cell
+        self.free_pos[cell] = self.n_free
+        self.n_free += 1
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        return {
+            "ids": self.ids.copy(),
+            "types": self.types.copy(),
+            "free": self.free.copy(),
+            "free_pos": self.free_pos.copy(),
+            "n_free": self.n_free,
+            "counts": None if self.counts is None else self.counts.copy(),
+        }
+
+    def copy(self) -> "Grid":
+        grid = Grid.__new__(Grid)
+        grid.size = self.size
+        grid.block = self.block
+        grid.n_blocks = self.n_blocks
+        if self.block:
+            grid.tile_cells = self.tile_cells
+        grid.counts = None if self.counts is None else self.counts.copy()
+        grid.tiles = [set(cells) for cells in self.tiles]
+        grid.ids = self.ids.copy()
+        grid.types = self.types.copy()
+        grid.free = self.free.copy()
+        grid.free_pos = self.free_pos.copy()
+        grid.n_free = self.n_free
+        grid.version = self.version
+        grid.stamps = self.stamps.copy()
+        grid.type_stamps = list(self.type_stamps)
+        return grid
+
+    def restore(self, state: Dict[str, np.ndarray]) -> None:
+        np.copyto(self.ids, state["ids"])
+        np.copyto(self.types, state["types"])
+        np.copyto(self.free, state["free"])
+        np.copyto(self.free_pos, state["free_pos"])
+        self.n_free = state["n_free"]
+        self._stamp_all()
+        if self.block:
+            np.copyto(self.counts, state["counts"])
+            self._reset_tiles()
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def is_empty(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and self.ids[y, x] == EMPTY
+
+    def get(self, x: int, y: int) -> int:
+        return int(self.ids[y, x])
+
+    def place(self, index: int, cell_type: int, location: Location) -> None:
+        x, y = location
+        old_type = int(self.types[y, x])
+        if self.block:
+            self._count(x, y, old_type, cell_type)
+        self.ids[y, x] = index
+        self.types[y, x] = cell_type
+        self._take(y * self.size + x)
+        self._stamp((old_type, cell_type), y * self.size + x)
+
+    def remove(self, location: Location) -> None:
+        x, y = location
+        old_type = int(self.types[y, x])
+        if self.block:
+            self._count(x, y, old_type, TYPE_EMPTY)
+        self.ids[y, x] = EMPTY
+        self.types[y, x] = TYPE_EMPTY
+        self._give(y * self.size + x)
+        self._stamp((old_type, TYPE_EMPTY), y * self.size + x)
+
+    def move(self, old: Location, new: Location) -> None:
+        old_x, old_y = old
+        new_x, new_y = new
+        cell_type = int(self.types[old_y, old_x])
+        replaced = int(self.types[new_y, new_x])
+        if self.block:
+            self._count(old_x, old_y, cell_type, TYPE_EMPTY)
+            self._count(new_x, new_y, replaced, cell_type)
+        self.ids[new_y, new_x] = self.ids[old_y, old_x]
+        self.types[new_y, new_x] = self.types[old_y, old_x]
+        self.ids[old_y, old_x] = EMPTY
+        self.types[old_y, old_x] = TYPE_EMPTY
+        self._take(new_y * self.size + new_x)
+        self._give(old_y * self.size + old_x)
+        self._stamp(
+            (cell_type, replaced, TYPE_EMPTY),
+            new_y * self.size + new_x,
+            old_y * self.size + old_x,
+        )
+
+    def empty_cells(self) -> np.ndarray:
+        """Flat indices (y * size + x) of all empty cells, in no particular order."""
+        return self.free[: self.n_free].copy()
+
+    def random_empty(self, rng: random.Random = random) -> Optional[Location]:
+        if not self.n_free:
+            return None
+        cell = int(self.free[rng.randrange(self.n_free)])
+        return (cell % self.size, cell // self.size)
+
+    def sample_empty(self, count: int, rng: random.Random = random) -> List[Location]:
+        """Up to `count` distinct empty cells, sampled without replacement."""
+        positions = rng.sample(range(self.n_free), min(count, self.n_free))
+        cells = self.free[positions].tolist()
+        return [(cell % self.size, cell // self.size) for cell in cells]
+
+    def nearest(self, location: Location, count: int) -> np.ndarray:
+        """Flat cells of up to `count` occupied cells closest to location.
+
+        Needs block > 0. Distance is Chebyshev, as in the 8-neighbourhood,
+        ties broken by Manhattan distance; the cell at location itself is
+        skipped. The search window of tiles around location's tile doubles
+        until no tile outside it can hold a closer cell, and only tiles with
+        entities in them are read, so the cost follows the number of entities
+        nearby rather than the map area.
+        """
+        x, y = location
+        n = self.n_blocks
+        tx, ty = x // self.block, y // self.block
+        radius = 0
+        while True:
+            x0, x1 = max(tx - radius, 0), min(tx + radius + 1, n)
+            y0, y1 = max(ty - radius, 0), min(ty + radius + 1, n)
+            occupied = (
+                self.counts[y0:y1, x0:x1, TYPE_EMPTY] < self.tile_cells[y0:y1, x0:x1]
+            )
+            rows, columns = np.nonzero(occupied)
+            tiles = ((rows + y0) * n + columns + x0).tolist()
+            found = np.array(
+                [cell for tile in tiles for cell in self.tiles[tile]], dtype=np.intp
+            )
+            found = found[found != y * self.size + x]
+            dx = np.abs(found % self.size - x)
+            dy = np.abs(found // self.size - y)
+            distance = np.maximum(dx, dy)
+            if x1 - x0 == y1 - y0 == n:
+                break
+            # every cell outside the window is more than radius * block away
+            if len(found) >= count and (
+                count == 0
+                or np.partition(distance, count - 1)[count - 1] <= radius * self.block
+            ):
+                break
+            radius = max(2 * radius, 1)
+
+        order = np.lexsort((found, dx + dy, distance))[:count]
+        return found[order]
+
+    def window(self, location: Location, radius: int) -> Tuple[np.ndarray, int, int]:
+        """View of the id layer within `radius` of location, clipped to the grid.
+
+        Returns the view and the (x, y) offset of its top-left cell.
+        """
+        x, y = location
+        x0, y0 = max(x - radius, 0), max(y - radius, 0)
+        x1, y1 = min(x + radius + 1, self.size), min(y + radius + 1, self.size)
+        return self.ids[y0:y1, x0:x1], x0, y0
@@ -0,0 +1,386 @@
+import heapq
+import weakref
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, TypeAlias
+
+from environment.flowfield import UNREACHABLE, wavefront
+from environment.grid import EMPTY, Grid
+
+Location: TypeAlias = Tuple[int, int]
+
+START = -1  # abstract node of the query's start
+MIN_DOUBLE_ENTRANCE = 6  # open border runs this long get an entrance at each end
+
+# an entrance's partners across borders, each at a cost of 1
+Links: TypeAlias = Dict[int, List[Tuple[int, int]]]
+
+
+def _terminal(cell: int) -> int:
+    """Abstract node of a goal cell, apart from an entrance on the same cell."""
+    return -cell - 2
+
+
+class _Cluster:
+    __slots__ = (
+        "index",
+        "x0",
+        "y0",
+        "x1",
+        "y1",
+        "built",
+        "checked",
+        "links",
+        "fields",
+        "edges",
+    )
+
+    def __init__(self, index: int, x0: int, y0: int, x1: int, y1: int) -> None:
+        self.index = index
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.built = -1  # grid version its cells were last read at
+        self.checked = -1  # grid version it was last found up to date at
+        self.links: Links = {}
+        # BFS distances inside the cluster from each entrance, and the nodes
+        # each leads to: the other entrances it reaches and its links
+        self.fields: Dict[int, np.ndarray] = {}
+        self.edges: Dict[int, List[Tuple[int, int]]] = {}
+
+    def local(self, cell: int, size: int) -> Tuple[int, int]:
+        y, x = divmod(cell, size)
+        return y - self.y0, x - self.x0
+
+    def cell(self, y: int, x: int, size: int) -> int:
+        return (self.y0 + y) * size + self.x0 + x
+
+
+# where the search leaves the start from: a cluster, the distances in it
+# from a cell next to or at start, and the cells from start to that one
+Origin: TypeAlias = Tuple[_Cluster, np.ndarray, List[int]]
+
+
+class HierarchicalPathfinder:
+    """HPA* over the empty cells of a Grid, for long routes on large maps.
+
+    The grid is cut into cluster_size x cluster_size clusters. Where the
+    empty cells along the border of two clusters face each other, an
+    entrance pair joins them, and inside each cluster the distances from
+    every entrance, found by one batched wavefront, give the edges of an
+    abstract graph. A query searches that graph with A* and refines each
+    step by walking down the stored distances, so only the clusters the
+    search reaches are ever built.
+
+    A cluster is rebuilt when a cell inside it has changed since it was
+    built (Grid.stamps); when only a neighbour changed, the distances of its
+    remaining entrances are kept. Paths follow a_star_path_finder of
+    Pathfinder: they end next to the goal and are near, not always exactly,
+    shortest.
+
+    `queries`, `expanded` (abstract nodes, over all queries),
+    `last_expanded` and `cluster_builds` (wavefronts run) count the work
+    done.
+    """
+
+    def __init__(self, cluster_size: int = 16) -> None:
+        self.cluster_size = cluster_size
+        self.queries = 0
+        self.expanded = 0
+        self.last_expanded = 0
+        self.cluster_builds = 0
+        self._bind(None)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # clusters belong to the grid, which a copy does not share
+        state = self.__dict__.copy()
+        state.update(_grid=None, clusters={}, borders={}, _stamps={})
+        return state
+
+    def _bind(self, grid: Optional[Grid]) -> None:
+        self._grid = weakref.ref(grid) if grid is not None else None
+        self._columns = -(-grid.size // self.cluster_size) if grid else 0
+        self.clusters: Dict[int, _Cluster] = {}
+        # entrance pairs by (cluster, cluster) and the version found at
+        self.borders: Dict[Tuple[int, int], Tuple[int, List[Tuple[int, int]]]] = {}
+        self._stamps: Dict[int, int] = {}
+        self._stamps_version = -1
+
+    # clusters
+
+    def _cluster_id(self, grid: Grid, cell: int) -> int:
+        y, x = divmod(cell, grid.size)
+        return (y // self.cluster_size) * self._columns + x // self.cluster_size
+
+    def _geometry(self, grid: Grid, cid: int) -> _Cluster:
+        cluster = self.clusters.get(cid)
+        if cluster is None:
+            cy, cx = divmod(cid, self._columns)
+            x0, y0 = cx * self.cluster_size, cy * self.cluster_size
+            cluster = _Cluster(
+                cid,
+                x0,
+                y0,
+                min(x0 + self.cluster_size, grid.size),
+                min(y0 + self.cluster_size, grid.size),
+            )
+            self.clusters[cid] = cluster
+        return cluster
+
+    def _stamp(self, grid: Grid, cid: int) -> int:
+        """Version of the last change to a cell of the cluster."""
+        if self._stamps_version != grid.version:
+            self._stamps = {}
+            self._stamps_version = grid.version
+        stamp = self._stamps.get(cid)
+        if stamp is None:
+            c = self._geometry(grid, cid)
+            stamps = grid.stamps.reshape(grid.size, grid.size)
+            stamp = int(stamps[c.y0 : c.y1, c.x0 : c.x1].max())
+            self._stamps[cid] = stamp
+        return stamp
+
+    def _neighbours(self, cid: int) -> List[int]:
+        columns = self._columns
+        cy, cx = divmod(cid, columns)
+        return [
+            ny * columns + nx
+            for ny, nx in ((cy, cx - 1), (cy, cx + 1), (cy - 1, cx), (cy + 1, cx))
+            if 0 <= ny < columns and 0 <= nx < columns
+        ]
+
+    def _border(self, grid: Grid, a: int, b: int) -> List[Tuple[int, int]]:
+        """Entrance pairs (cell in a, cell in b) across the border of a and b."""
+        key = (min(a, b), max(a, b))
+        cached = self.borders.get(key)
+        if cached is not None and cached[0] >= max(
+            self._stamp(grid, a), self._stamp(grid, b)
+        ):
+            pairs = cached[1]
+        else:
+            pairs = self._find_entrances(grid, *key)
+            self.borders[key] = (grid.version, pairs)
+        return pairs if a < b else [(cell_b, cell_a) for cell_a, cell_b in pairs]
+
+    def _find_entrances(self, grid: Grid, a: int, b: int) -> List[Tuple[int, int]]:
+        """One entrance pair per open run of the border, two for long runs."""
+        first, second = self._geometry(grid, a), self._geometry(grid, b)
+        size = grid.size
+        if first.y0 == second.y0:  # side by side, b on the right
+            inside = np.arange(first.y0, first.y1) * size + first.x1 - 1
+            outside = inside + 1
+        else:  # b below
+            inside = (first.y1 - 1) * size + np.arange(first.x0, first.x1)
+            outside = inside + size
+        ids = grid.ids.reshape(-1)
+        open_ = (ids[inside] == EMPTY) & (ids[outside] == EMPTY)
+
+        steps = np.diff(open_.astype(np.int8), prepend=0, append=0)
+        pairs = []
+        for run_start, run_end in zip(
+            np.flatnonzero(steps == 1).tolist(), np.flatnonzero(steps == -1).tolist()
+        ):
+            if run_end - run_start >= MIN_DOUBLE_ENTRANCE:
+                picks = (run_start, run_end - 1)
+            else:
+                picks = ((run_start + run_end - 1) // 2,)
+            pairs += [(int(inside[i]), int(outside[i])) for i in picks]
+        return pairs
+
+    def _ensure(self, grid: Grid, cid: int) -> _Cluster:
+        """The cluster with its entrances, distances and edges up to date."""
+        cluster = self._geometry(grid, cid)
+        if cluster.checked == grid.version:
+            return cluster
+        cluster.checked = grid.version
+
+        changed = self._stamp(grid, cid) > cluster.built
+        links: Links = {}
+        for other in self._neighbours(cid):
+            for cell, partner in self._border(grid, cid, other):
+                links.setdefault(cell, []).append((partner, 1))
+        if not changed and links == cluster.links:
+            return cluster
+
+        # distances inside are only stale if a cell inside changed
+        fields = {} if changed else cluster.fields
+        fields = {cell: fields[cell] for cell in links if cell in fields}
+        missing = [cell for cell in links if cell not in fields]
+        if missing:
+            passable = self._passable(grid, cluster)
+            seeds = np.zeros((len(missing),) + passable.shape, dtype=bool)
+            for i, cell in enumerate(missing):
+                seeds[(i,) + cluster.local(cell, grid.size)] = True
+            fields.update(zip(missing, wavefront(passable, seeds)))
+            self.cluster_builds += 1
+
+        entrances = list(links)
+        rows, columns = (
+            np.array(
+                [cluster.local(cell, grid.size) for cell in entrances], dtype=np.intp
+            )
+            .reshape(-1, 2)
+            .T
+        )
+        cluster.edges = {}
+        for cell in entrances:
+            distances = fields[cell][rows, columns].tolist()
+            cluster.edges[cell] = [
+                (other, distance)
+                for other, distance in zip(entrances, distances)
+                if other != cell and distance != UNREACHABLE
+            ] + links[cell]
+        cluster.links = links
+        cluster.fields = fields
+        cluster.built = grid.version
+        return cluster
+
+    @staticmethod
+    def _passable(grid: Grid, cluster: _Cluster) -> np.ndarray:
+        return grid.ids[cluster.y0 : cluster.y1, cluster.x0 : cluster.x1] == EMPTY
+
+    # queries
+
+    def _origins(self, grid: Grid, start: int) -> List[Origin]:
+        """The start cluster, seen from start, and for a start that is not
+        empty (like the cell of the creature asking) the clusters it can
+        step straight into across a border."""
+        size = grid.size
+        cluster = self._ensure(grid, self._cluster_id(grid, start))
+        passable = self._passable(grid, cluster)
+        seed = np.zeros_like(passable)
+        seed[cluster.local(start, size)] = True
+        origins = [(cluster, wavefront(passable | seed, seed), [])]
+        if grid.ids.flat[start] == EMPTY:
+            return origins
+
+        y, x = divmod(start, size)
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            cell = ny * size + nx
+            if not grid.in_bounds(nx, ny) or grid.ids[ny, nx] != EMPTY:
+                continue
+            other = self._ensure(grid, self._cluster_id(grid, cell))
+            if other is cluster:
+                continue
+            passable = self._passable(grid, other)
+            seed = np.zeros_like(passable)
+            seed[other.local(cell, size)] = True
+            origins.append((other, wavefront(passable, seed), [cell]))
+        return origins
+
+    def find_path(self, start: Location, goal: Location, grid: Grid) -> List[Location]:
+        """Path through empty cells from start to next to goal, start excluded.
+
+        Empty when start is already next to goal or when goal cannot be
+        reached.
+        """
+        if self._grid is None or self._grid() is not grid:
+            self._bind(grid)
+        self.queries += 1
+        self.last_expanded = 0
+        size = grid.size
+        (sx, sy), (gx, gy) = start, goal
+        if abs(sx - gx) <= 1 and abs(sy - gy) <= 1:
+            return []
+
+        # the goal is reached on any empty cell around it
+        targets: Dict[int, List[int]] = {}
+        for y in range(max(gy - 1, 0), min(gy + 2, size)):
+            for x in range(max(gx - 1, 0), min(gx + 2, size)):
+                if (x, y) != (gx, gy) and grid.ids[y, x] == EMPTY:
+                    cell = y * size + x
+                    targets.setdefault(self._cluster_id(grid, cell), []).append(cell)
+        if not targets:
+            return []
+
+        def heuristic(cell: int) -> int:
+            y, x = divmod(cell, size)
+            return max(abs(x - gx) - 1, 0) + max(abs(y - gy) - 1, 0)
+
+        def exits(cluster: _Cluster, field: np.ndarray):
+            for cell in targets.get(cluster.index, ()):
+                distance = int(field[cluster.local(cell, size)])
+                if distance != UNREACHABLE:
+                    yield _terminal(cell), distance
+
+        origins = self._origins(grid, sy * size + sx)
+        g_score: Dict[int, int] = {}
+        came_from: Dict[int, int] = {}
+        via: Dict[int, int] = {}  # origin of the nodes entered from START
+        open_heap = []
+        for i, (cluster, field, lead) in enumerate(origins):
+            firsts = [
+                (cell, int(field[cluster.local(cell, size)])) for cell in cluster.links
+            ]
+            for node, distance in firsts + list(exits(cluster, field)):
+                cost = len(lead) + distance
+                if distance != UNREACHABLE and cost < g_score.get(node, cost + 1):
+                    g_score[node], came_from[node], via[node] = cost, START, i
+        for node, cost in g_score.items():
+            h = 0 if node < START else heuristic(node)
+            open_heap.append((cost + h, h, node))
+        heapq.heapify(open_heap)
+
+        closed = set()
+        found = None
+        while open_heap:
+            _, _, node = heapq.heappop(open_heap)
+            if node in closed:
+                continue
+            if node < START:
+                found = node
+                break
+            closed.add(node)
+            self.last_expanded += 1
+            cluster = self._ensure(grid, self._cluster_id(grid, node))
+            for neighbour, cost in cluster.edges[node] + list(
+                exits(cluster, cluster.fields[node])
+            ):
+                tentative = g_score[node] + cost
+                if tentative < g_score.get(neighbour, tentative + 1):
+                    g_score[neighbour] = tentative
+                    came_from[neighbour] = node
+                    h = 0 if neighbour < START else heuristic(neighbour)
+                    heapq.heappush(open_heap, (tentative + h, h, neighbour))
+        self.expanded += self.last_expanded
+        if found is None:
+            return []
+
+        chain = [found]
+        while chain[-1] != START:
+            chain.append(came_from[chain[-1]])
+        chain.reverse()
+        cells = self._refine(grid, chain, origins[via[chain[1]]])
+        return [(cell % size, cell // size) for cell in cells]
+
+    def _refine(self, grid: Grid, chain: List[int], origin: Origin) -> List[int]:
+        """Cells along an abstract path from START to a goal cell."""
+        cells = []
+        for node, following in zip(chain, chain[1:]):
+            target = -following - 2 if following < START else following
+            if node == START:
+                cluster, field, lead = origin
+                cells += lead + self._descend(grid, cluster, field, target)
+                continue
+            cluster = self.clusters[self._cluster_id(grid, node)]
+            if following >= 0 and self._cluster_id(grid, following) != cluster.index:
+                cells.append(following)  # across a border
+            else:
+                cells += self._descend(grid, cluster, cluster.fields[node], target)
+        return cells
+
+    @staticmethod
+    def _descend(
+        grid: Grid, cluster: _Cluster, field: np.ndarray, cell: int
+    ) -> List[int]:
+        """Cells from the source of `field` to `cell`, source excluded."""
+        height, width = field.shape
+        y, x = cluster.local(cell, grid.size)
+        distance = field[y, x]
+        cells = []
+        while distance > 0:
+            cells.append(cluster.cell(y, x, grid.size))
+            distance -= 1
+            for ny, nx in ((y, x - 1), (y, x + 1), (y - 1, x), (y + 1, x)):
+                if 0 <= ny < height and 0 <= nx < width and field[ny, nx] == distance:
+                    y, x = ny, nx
+                    break
+        cells.reverse()
+        return cells
@@ -0,0 +1,123 @@
+import numpy as np
+import pygame
+from typing import Iterable, List, Optional, Tuple, TypeAlias
+
+from environment.astar import AStar
+from settings import TILESIZE
+from utils.support import to_grid, to_world
+
+Cell: TypeAlias = Tuple[int, int]
+
+
+class NavGrid:
+    """Walkability bitmap of tiles, for paths between world positions.
+
+    Pathfinder.astar_pathfinding grids its obstacle rects into one for each
+    query. A rect blocks the tiles it covers, its right and bottom edges
+    excluded; `walkable[y, x]` is the tile at world tile (x, y) + origin.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tile_size: int = TILESIZE,
+        origin: Cell = (0, 0),
+    ) -> None:
+        self.tile_size = tile_size
+        self.origin = origin
+        self.walkable = np.ones((height, width), dtype=bool)
+
+    @property
+    def width(self) -> int:
+        return self.walkable.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.walkable.shape[0]
+
+    @classmethod
+    def from_rects(
+        cls,
+        rects: Iterable[pygame.Rect],
+        cells: Iterable[Cell] = (),
+        tile_size: int = TILESIZE,
+    ) -> "NavGrid":
+        """Grid just covering `rects` and `cells`, with a free border."""
+        rects = list(rects)
+        corners = [to_grid(pygame.Vector2(rect.topleft), tile_size) for rect in rects]
+        corners += [
+            to_grid(pygame.Vector2(rect.right - 1, rect.bottom - 1), tile_size)
+            for rect in rects
+        ]
+        corners += list(cells)
+        x0 = min((x for x, _ in corners), default=0) - 1
+        y0 = min((y for _, y in corners), default=0) - 1
+        width = max((x for x, _ in corners), default=0) + 2 - x0
+        height = max((y for _, y in corners), default=0) + 2 - y0
+
+        nav = cls(width, height, tile_size, origin=(x0, y0))
+        for rect in rects:
+            nav.add_obstacle(rect)
+        return nav
+
+    def _span(self, rect: pygame.Rect) -> Tuple[slice, slice]:
+        """Rows and columns of the tiles under `rect`, clipped to the grid."""
+        x0, y0 = self.origin
+        size = self.tile_size
+        left = max(int(rect.left // size) - x0, 0)
+        top = max(int(rect.top // size) - y0, 0)
+        right = min(int((rect.right - 1) // size) - x0 + 1, self.width)
+        bottom = min(int((rect.bottom - 1) // size) - y0 + 1, self.height)
+        return slice(top, max(bottom, top)), slice(left, max(right, left))
+
+    def add_obstacle(self, rect: pygame.Rect) -> None:
+        rows, columns = self._span(rect)
+        self.walkable[rows, columns] = False
+
+    def index(self, cell: Cell) -> Optional[int]:
+        """Flat index of a world tile, None outside the grid."""
+        x, y = cell[0] - self.origin[0], cell[1] - self.origin[1]
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return None
+
+    def cell(self, index: int) -> Cell:
+        return (
+            self.origin[0] + index % self.width,
+            self.origin[1] + index // self.width,
+        )
+
+    def is_walkable(self, cell: Cell) -> bool:
+        index = self.index(cell)
+        return index is not None and bool(self.walkable.flat[index])
+
+    def nearest_walkable(self, cell: Cell) -> Optional[Cell]:
+        """`cell` if walkable, else its first walkable 4-connected neighbour."""
+        if self.is_walkable(cell):
+            return cell
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            neighbour = (cell[0] + dx, cell[1] + dy)
+            if self.is_walkable(neighbour):
+                return neighbour
+        return None
+
+    def path(
+        self, start: pygame.Vector2, goal: pygame.Vector2, astar: AStar
+    ) -> List[pygame.Vector2]:
+        """Tile centres from `start` to the tile of `goal`, start excluded.
+
+        A blocked goal is moved to a walkable neighbour; [] when
+        there is none, when start is off the grid or goal unreachable.
+        """
+        start_index = self.index(to_grid(start, self.tile_size))
+        goal_cell = self.nearest_walkable(to_grid(goal, self.tile_size))
+        if start_index is None or goal_cell is None:
+            return []
+
+        path = astar.search(
+            self.walkable.tobytes(), self.width, start_index, self.index(goal_cell)
+        )
+        if path is None:
+            return []
+        return [to_world(self.cell(index), self.tile_size) for index in path]
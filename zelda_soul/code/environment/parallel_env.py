@@ -0,0 +1,173 @@
+import numpy as np
+from gymnasium import spaces
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from entities.stats import STATUS_FIELDS
+from environment.env import Environment, EnvironmentConfig
+from environment.grid import TYPE_CREATURE, TYPE_PLAYER
+from settings import MAX_STEP_COUNT
+
+Observation = Dict[str, np.ndarray]
+
+
+class ParallelEnvironment:
+    """PettingZoo-style parallel API where every live creature is an agent.
+
+    Observations are stacked, row i belonging to agents[i], and step() takes
+    one action per row, so a single batched forward pass can drive the
+    whole population:
+
+        obs, infos = penv.reset()
+        while penv.agents:
+            actions, _, _ = agent.choose_actions(obs["grid"], infos["action_mask"])
+            obs, rewards, terminations, truncations, infos = penv.step(actions)
+
+    Each agent sees the type grid with itself marked as the player (the
+    input of ppo_sonet.ActorCritic) and its own continuous stats. Rewards,
+    terminations and truncations returned by step() follow the agents that
+    acted, listed in infos["agents"]; the new observations and
+    infos["action_mask"] follow the updated `agents`, which drops the dead
+    and adds newborns.
+    """
+
+    metadata = {"name": "zelda_soul_parallel_v0", "render_modes": ["console"]}
+
+    def __init__(self, config: Optional[EnvironmentConfig] = None) -> None:
+        self.env = Environment(config)
+        size = self.env.config.size
+        self._observation_space = spaces.Dict(
+            {
+                "grid": spaces.Box(
+                    low=0,
+                    high=self.env.n_types - 1,
+                    shape=(size, size),
+                    dtype=np.uint8,
+                ),
+                "continuous": self.env.observation_space["continuous"],
+            }
+        )
+        self._action_space = self.env.action_space
+        self.agents: List[str] = []
+        self.handles = np.zeros(0, dtype=np.int64)
+
+    def observation_space(self, agent: str) -> spaces.Dict:
+        return self._observation_space
+
+    def action_space(self, agent: str) -> spaces.Discrete:
+        return self._action_space
+
+    @property
+    def num_agents(self) -> int:
+        return len(self.agents)
+
+    def _sync_agents(self) -> None:
+        env = self.env
+        handles = [
+            handle
+            for handle, entity in env.entities.items()
+            if env.kinds[handle] == TYPE_CREATURE and not entity.status.deleted
+        ]
+        self.handles = np.array(handles, dtype=np.int64)
+        self.agents = [env.entities[handle].id for handle in handles]
+
+    def observations(self) -> Observation:
+        """Stacked observations of all agents."""
+        env = self.env
+        size = env.config.size
+        creatures = [env.entities[handle] for handle in self.handles.tolist()]
+        n = len(creatures)
+
+        locations = np.array([c.location for c in creatures], dtype=np.int64)
+        locations = locations.reshape(n, 2)
+        slots = np.array([c.slot for c in creatures], dtype=np.int64)
+
+        grid = np.empty((n, size, size), dtype=np.uint8)
+        grid[:] = env.grid.types
+        grid[np.arange(n), locations[:, 1], locations[:, 0]] = TYPE_PLAYER
+
+        n_status = len(STATUS_FIELDS)
+        continuous = np.empty((n, n_status + 2), dtype=np.int32)
+        continuous[:, :n_status] = env.creatures.status[slots]
+        continuous[:, n_status] = env.creatures.columns["hp"][slots]
+        continuous[:, n_status + 1] = env.creatures.columns["energy"][slots]
+        return {"grid": grid, "continuous": continuous}
+
+    def action_masks(self) -> np.ndarray:
+        """Stacked valid-action masks of all agents, (num_agents, n_actions)."""
+        env = self.env
+        creatures = [env.entities[handle] for handle in self.handles.tolist()]
+        return env.action_mask_batch(
+            [c.location for c in creatures], [c.slot for c in creatures]
+        )
+
+    def reset(
+        self, seed: Optional[int] = None, options: Optional[dict] = None
+    ) -> Tuple[Observation, Dict[str, Any]]:
+        self.env.reset(seed=seed, options=options)
+        self._sync_agents()
+        infos = {"agents": list(self.agents), "action_mask": self.action_masks()}
+        return self.observations(), infos
+
+    def step(
+        self, actions: Union[np.ndarray, List[int], Mapping[str, int]]
+    ) -> Tuple[Observation, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Act for every agent, in `agents` order, then decay and advance time.
+
+        `actions` is an array with one action per agent, or a dict keyed by
+        agent id. Like Environment.step, an agent that starts the step with
+        no hp left is terminated with reward -200; so is one killed earlier in
+        the same step by another agent. One killed after its own action keeps
+        that action's reward.
+        """
+        env = self.env
+        if isinstance(actions, Mapping):
+            actions = [actions[agent] for agent in self.agents]
+        actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+        if len(actions) != len(self.agents):
+            raise ValueError(f"expected {len(self.agents)} actions, got {len(actions)}")
+
+        n = len(self.agents)
+        rewards = np.zeros(n, dtype=np.float32)
+        terminations = np.zeros(n, dtype=bool)
+        for i, (handle, action) in enumerate(
+            zip(self.handles.tolist(), actions.tolist())
+        ):
+            creature = env.entities.get(handle)
+            if creature is None or creature.stats.hp <= 0:
+                terminations[i] = True
+                rewards[i] = -200
+                continue
+            _, rewards[i] = env.act(creature, action)
+
+        # remove agents that were dead before acting
+        dead = [
+            handle
+            for handle, done in zip(self.handles.tolist(), terminations)
+            if done and handle in env.entities
+        ]
+        if dead:
+            env.remove_deleted(dead)
+        # and report the ones killed after their own action
+        terminations |= ~np.isin(self.handles, list(env.entities))
+
+        # decay
+        alive = [
+            env.entities[h].slot for h in self.handles.tolist() if h in env.entities
+        ]
+        env.creatures.decay(slots=np.array(alive, dtype=np.int64))
+        env.step_count += 1
+        truncations = np.full(n, env.step_count >= MAX_STEP_COUNT)
+
+        infos = {"agents": self.agents}
+        self._sync_agents()
+        if truncations.any():
+            self.agents = []
+            self.handles = self.handles[:0]
+        infos["action_mask"] = self.action_masks()
+        return self.observations(), rewards, terminations, truncations, infos
+
+    def render(self) -> None:
+        self.env.render()
+
+    def close(self) -> None:
+        self.env.close()
@@ -1,7 +1,15 @@
 import pygame
-from queue import PriorityQueue
-import random
-from typing import TYPE_CHECKING, List, Optional, TypeAlias, Tuple, Union
+import weakref
+import numpy as np
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TypeAlias, Tuple, Union
+
+from environment.astar import AStar
+from environment.flowfield import FlowField
+from environment.grid import EMPTY, TYPE_RESOURCE, Grid
+from environment.hpastar import HierarchicalPathfinder
+from environment.navgrid import NavGrid
+from utils.support import to_grid
 
 if TYPE_CHECKING:
     from entities.creature import Creature
@@ -11,163 +19,103 @@ if TYPE_CHECKING:
 Location: TypeAlias = Tuple[int, int]
 
 
+# grid the path was found on, its version then, its flat cells and the path
+PathEntry: TypeAlias = Tuple["weakref.ref[Grid]", int, np.ndarray, List[Location]]
+
+
 class Pathfinder:
-    def __init__(self):
-        pass
+    def __init__(self, cache_size: int = 1024):
+        # shared by the path queries, its counters report their cost
+        self.astar = AStar()
+        # a_star_path_finder results by (start, goal), least recently used
+        # first; an entry is dropped once a cell on its path changes
+        self.cache: "OrderedDict[Tuple[Location, Location], PathEntry]" = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        # flow fields by (goal, blocking types), for many creatures chasing
+        # one goal; rebuilt on use when stale, least recently used dropped
+        self.flow_fields: "OrderedDict[Tuple[Location, Tuple[int, ...]], FlowField]" = (
+            OrderedDict()
+        )
+        self.flow_field_limit = 16
+        # clusters of the env grid for long routes, rebuilt where it changes
+        self.hierarchy = HierarchicalPathfinder()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # cached paths hold weak references to their grid, and a copy would
+        # not find its own grid in them anyway
+        state = self.__dict__.copy()
+        state["cache"] = OrderedDict()
+        return state
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "size": len(self.cache),
+            "capacity": self.cache_size,
+            "flow_fields": len(self.flow_fields),
+            "flow_field_builds": sum(f.builds for f in self.flow_fields.values()),
+            "cluster_builds": self.hierarchy.cluster_builds,
+        }
+
+    def clear_cache(self) -> None:
+        self.cache.clear()
+        self.flow_fields.clear()
 
     def get_all_movable_cells(
         self, creature: "Creature", env: "Environment"
     ) -> List[Location]:
-        movable_cells = []
         x, y = creature.location
         move_range = creature.stats.move_speed
 
-        for dy in range(-move_range, move_range + 1):
-            for dx in range(-move_range, move_range + 1):
-                new_x = x + dx
-                new_y = y + dy
-
-                if 0 <= new_x < env.config.size and 0 <= new_y < env.config.size:
-                    distance = abs(dx) + abs(dy)
-                    if distance <= move_range and env.grid[new_y][new_x] == "-1":
-                        movable_cells.append((new_x, new_y))
+        window, x0, y0 = env.grid.window(creature.location, move_range)
+        ys, xs = np.nonzero(window == EMPTY)
+        xs += x0
+        ys += y0
+        in_range = np.abs(xs - x) + np.abs(ys - y) <= move_range
 
-        return movable_cells
+        return list(zip(xs[in_range].tolist(), ys[in_range].tolist()))
 
     def get_all_entities_in_range(
         self, creature: "Creature", env: "Environment"
-    ) -> List[str]:
-        """Get all entity IDs within move range of the creature."""
-        x, y = creature.location
-        move_range = creature.stats.move_speed
-        entities_in_range = []
-
-        for dy in range(-move_range, move_range + 1):
-            for dx in range(-move_range, move_range + 1):
-                new_x = x + dx
-                new_y = y + dy
-
-                if 0 <= new_x < env.config.size and 0 <= new_y < env.config.size:
-                    entity_id = env.grid[new_y][new_x]
-                    if entity_id != "-1":
-                        entities_in_range.append(entity_id)
-
-        return entities_in_range
-
-    def astar_pathfinding(self, start, goal, obstacles, tile_size):
-
-        def find_nearest_walkable(grid, obstacle_grids):
-            # Check all 4-connected neighbors
-            neighbors = [
-                (grid[0] + dx, grid[1] + dy)
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            ]
-            # Return the first valid neighbor that is not an obstacle
-            for neighbor in neighbors:
-                if neighbor not in obstacle_grids:
-                    return neighbor
-            return None  # No valid adjacent grid
-
-        def get_occupied_grids(rect, tile_size):
-            """Returns all grid positions occupied by a rectangular obstacle."""
-            grids = set()
-            start_x = int(rect.left // tile_size)
-            start_y = int(rect.top // tile_size)
-            end_x = int(rect.right // tile_size)
-            end_y = int(rect.bottom // tile_size)
-
-            for x in range(start_x, end_x + 1):
-                for y in range(start_y, end_y + 1):
-                    grids.add((x, y))
-            return grids
-
-        start_grid = self.to_grid(start, tile_size)
-        goal_grid = self.to_grid(goal, tile_size)
-
-        # Mark all occupied grids
-        obstacle_grids = set()
-        for obj in obstacles:
-            obstacle_grids.update(get_occupied_grids(obj, tile_size))
-
-        # Adjust goal if it's in the obstacle grid
-        if goal_grid in obstacle_grids:
-            goal_grid = find_nearest_walkable(goal_grid, obstacle_grids)
-            if not goal_grid:
-                return []  # No valid path available
-
-        # Heuristic function (Manhattan distance)
-        def heuristic(a, b):
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-        # A* setup
-        open_set = PriorityQueue()
-        open_set.put((0, start_grid))
-        came_from = {}
-        g_score = {start_grid: 0}
-        f_score = {start_grid: heuristic(start_grid, goal_grid)}
-
-        while not open_set.empty():
-            _, current_grid = open_set.get()
-
-            if current_grid == goal_grid:
-                # Reconstruct path
-                path = []
-                while current_grid in came_from:
-                    path.append(self.to_world(current_grid, tile_size))
-                    current_grid = came_from[current_grid]
-                path.reverse()
-                return path
-
-            # Explore neighbors
-            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                neighbor = (current_grid[0] + dx, current_grid[1] + dy)
-                if neighbor in obstacle_grids:
-                    continue
-
-                tentative_g_score = g_score[current_grid] + 1
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current_grid
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + heuristic(
-                        neighbor, goal_grid
-                    )
-                    open_set.put((f_score[neighbor], neighbor))
-
-        return []  # No path found
+    ) -> List[int]:
+        """Get all entity handles within move range of the creature."""
+        window, _, _ = env.grid.window(creature.location, creature.stats.move_speed)
+        return window[window != EMPTY].tolist()
+
+    def astar_pathfinding(
+        self,
+        start: pygame.Vector2,
+        goal: pygame.Vector2,
+        obstacles: List[pygame.Rect],
+        tile_size: int,
+    ) -> List[pygame.Vector2]:
+        """Path of tile centres between two world positions, around `obstacles`."""
+        nav = NavGrid.from_rects(
+            obstacles, [to_grid(start, tile_size), to_grid(goal, tile_size)], tile_size
+        )
+        return nav.path(start, goal, self.astar)
 
     def get_random_empty_location(self, env: "Environment") -> Optional[Location]:
         """Get a random empty cell in the grid."""
-        empty_cells = []
-        for y in range(env.config.size):
-            for x in range(env.config.size):
-                if env.grid[y][x] == "-1":
-                    empty_cells.append((x, y))
-
-        if empty_cells:
-            location = random.choice(empty_cells)
-            return location
-        return None
-
-    def get_adjacent_entities(self, location: Location, env: "Environment") -> List[str]:
+        return env.grid.random_empty(env.rng)
+
+    def get_adjacent_entities(
+        self, location: Location, env: "Environment"
+    ) -> List[int]:
         x, y = location
-        adjacent_entities = []
+        window, x0, y0 = env.grid.window(location, 1)
 
         # Check all adjacent cells (including diagonals)
-        for dy in [-1, 0, 1]:
-            for dx in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
-
-                new_x = x + dx
-                new_y = y + dy
-
-                # Check if within bounds
-                if 0 <= new_x < env.config.size and 0 <= new_y < env.config.size:
-                    entity_id = env.grid[new_y][new_x]
-                    if entity_id != "-1":
-                        adjacent_entities.append(entity_id)
+        occupied = window != EMPTY
+        if env.grid.in_bounds(x, y):
+            occupied[y - y0, x - x0] = False
 
-        return adjacent_entities
+        return window[occupied].tolist()
 
     def get_valid_adjacent_cell(
         self, location: Location, env: "Environment", include_diagonals: bool = True
@@ -188,11 +136,7 @@ class Pathfinder:
                 new_y = y + dy
 
                 # Check if within bounds and empty
-                if (
-                    0 <= new_x < env.config.size
-                    and 0 <= new_y < env.config.size
-                    and env.grid[new_y][new_x] == "-1"
-                ):
+                if env.grid.is_empty(new_x, new_y):
                     valid_cells.append((new_x, new_y))
 
         return valid_cells
@@ -200,19 +144,13 @@ class Pathfinder:
     def relocate(
         self, c: "Creature", new_location: Location, env: "Environment"
     ) -> bool:
-        old_x, old_y = c.location
         new_x, new_y = new_location
 
         # Check if new location is within bounds and empty
-        if (
-            0 <= new_x < env.config.size
-            and 0 <= new_y < env.config.size
-            and env.grid[new_y][new_x] == "-1"
-        ):
+        if env.grid.is_empty(new_x, new_y):
 
             # Update grid
-            env.grid[old_y][old_x] = "-1"
-            env.grid[new_y][new_x] = c.id
+            env.grid.move(c.location, new_location)
 
             # Update entity location
             c.location = new_location
@@ -229,56 +167,113 @@ class Pathfinder:
     def a_star_path_finder(
         self, start: Location, goal: Location, env: "Environment"
     ) -> List[Location]:
-        # a stars using two weights (g and h) and a priority queue that use the f score which is sum of g and h
-        # g is the cost to reach the node from the start node
-        # h is the heuristic which is the estimated cost to reach the goal from the node
-        """Find the shortest path from start to goal using A* algorithm."""
-
-        def heuristic(a: Location, b: Location) -> int:
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-        # Initialize the open set and closed set
-        open_set = PriorityQueue()
-        open_set.put((0, start))
-        # came_from = {}
-        path = []
-        g_score = {start: 0}
-        # calculate h score for all nodes
-        h_score = {}
-
-        while not open_set.empty():
-
-            _, current = open_set.get()
-            path.append(current)
-
-            if self.is_adjacent(current, goal):
-                break
-
-            adjacents = self.get_valid_adjacent_cell(
-                current, env, include_diagonals=False
-            )
-            for adjacent in adjacents:
-                if adjacent not in g_score:
-                    g_score[adjacent] = g_score[current] + 1
-                    h_score = heuristic(adjacent, goal)
-                    f_score = g_score[adjacent] + h_score
-                    open_set.put((f_score, adjacent))
+        """Shortest 4-connected path through empty cells to next to `goal`.
+
+        The path ends on the first cell adjacent to goal (diagonals included)
+        and leaves out start, so it is empty when start is already adjacent
+        or when goal cannot be reached.
+
+        Paths are cached by (start, goal) and reused until a cell on them is
+        taken or freed, whether by relocate, spawning or deletion, or until
+        the grid is cleared or restored. A cached path stays valid but may
+        no longer be the shortest once cells off it are freed.
+        """
+        grid = env.grid
+        key = (tuple(start), tuple(goal))
+        entry = self.cache.get(key)
+        if entry is not None:
+            grid_ref, version, cells, path = entry
+            # the path only needs its own cells to still be empty
+            if grid_ref() is grid and grid.stamps[cells].max() <= version:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return list(path)
+            del self.cache[key]
+            self.invalidated += 1
+        self.misses += 1
+
+        size = grid.size
+        cells = self.astar.search(
+            (grid.ids == EMPTY).tobytes(),
+            size,
+            start[1] * size + start[0],
+            goal[1] * size + goal[0],
+            reach=1,
+        )
+        if not cells:
+            # nothing to invalidate a missing path by, so it is not kept
+            return []
+        path = [(cell % size, cell // size) for cell in cells]
+        if self.cache_size:
+            self.cache[key] = (weakref.ref(grid), grid.version, np.array(cells), path)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return list(path)
+
+    def hierarchical_path_finder(
+        self, start: Location, goal: Location, env: "Environment"
+    ) -> List[Location]:
+        """a_star_path_finder through HierarchicalPathfinder, for long routes.
 
-        return path
+        Searches entrances between grid clusters instead of every cell, so
+        the cost grows with the number of clusters on the way rather than
+        the area around it. Paths may be a few steps longer than shortest.
+        """
+        return self.hierarchy.find_path(tuple(start), tuple(goal), env.grid)
 
     def move_to_target(
         self, c: "Creature", entity: Union["Creature", "Resource"], env: "Environment"
     ) -> bool:
 
-        start = c.location
-        goal = entity.location
-        path = self.pathfinder(start, goal, env)
-        end = path[-1]
-        # move to the max range limit by move speed for each step
-        if len(path) > c.stats.move_speed:
-            end = path[c.stats.move_speed]
-
-        self.relocate(c, end, env)
+        path = self.a_star_path_finder(c.location, entity.location, env)
+        if not path:
+            return False
+        # move along the path as far as move speed allows this step
+        end = path[min(c.stats.move_speed, len(path)) - 1]
+
+        return self.relocate(c, end, env)
+
+    def flow_field(
+        self,
+        goal: Location,
+        env: "Environment",
+        blocking: Tuple[int, ...] = (TYPE_RESOURCE,),
+    ) -> FlowField:
+        """The up to date FlowField towards `goal`, shared by every caller.
+
+        Building one costs a single wavefront over the grid, after which
+        each creature reads its step in constant time. It is only rebuilt
+        when a `blocking` layer of the grid changes; a goal that moves to
+        another cell gets a field of its own.
+        """
+        key = (tuple(goal), tuple(blocking))
+        field = self.flow_fields.get(key)
+        if field is None:
+            field = FlowField(key[0], blocking)
+            self.flow_fields[key] = field
+            if len(self.flow_fields) > self.flow_field_limit:
+                self.flow_fields.popitem(last=False)
+        else:
+            self.flow_fields.move_to_end(key)
+        field.refresh(env.grid)
+        return field
+
+    def flow_to_target(
+        self, c: "Creature", entity: Union["Creature", "Resource"], env: "Environment"
+    ) -> bool:
+        """move_to_target through the shared flow field of `entity`'s cell.
+
+        Moves one cell at a time, up to move speed, around creatures in the
+        way. Returns whether it moved at all.
+        """
+        field = self.flow_field(entity.location, env)
+        moved = False
+        for _ in range(c.stats.move_speed):
+            step = field.next_step(c.location)
+            if step is None or not self.relocate(c, step, env):
+                break
+            moved = True
+        return moved
 
     # move env
     # move sprite
@@ -0,0 +1,55 @@
+import math
+from typing import List
+
+from utils.priorityqueue import PriorityQueueWithUpdate
+
+ACT_INTERVAL = 4  # ticks between two acts of a creature with speed 1
+
+# stat that sets how soon a creature acts again after each action
+ACTION_SPEED = {"attack": "attack_speed"}
+
+
+class Scheduler:
+    """Next-act tick of every creature, for Environment.env_step.
+
+    Each env_step is one tick and only wakes the creatures due by then, so
+    its cost follows the number of acting creatures rather than the number
+    of entities. Resources are never scheduled. A creature acts again
+    ceil(ACT_INTERVAL / speed) ticks after each action, with the speed stat
+    picked by ACTION_SPEED (move_speed by default).
+    """
+
+    def __init__(self) -> None:
+        self.tick = 0
+        self.queue = PriorityQueueWithUpdate()
+
+    def __len__(self) -> int:
+        return self.queue.qsize()
+
+    def clear(self) -> None:
+        self.tick = 0
+        self.queue = PriorityQueueWithUpdate()
+
+    def copy(self) -> "Scheduler":
+        scheduler = Scheduler()
+        scheduler.tick = self.tick
+        scheduler.queue = self.queue.copy()
+        return scheduler
+
+    def add(self, handle: int, delay: int = 0) -> None:
+        """(Re)schedule a creature `delay` ticks from now."""
+        self.queue.put(self.tick + delay, handle)
+
+    def remove(self, handle: int) -> None:
+        self.queue.remove_task(handle)
+
+    @staticmethod
+    def interval(speed: float) -> int:
+        return max(1, math.ceil(ACT_INTERVAL / max(speed, 1)))
+
+    def due(self) -> List[int]:
+        """Pop the handles due by the current tick, earliest first."""
+        handles = []
+        while not self.queue.empty() and self.queue.peek()[0] <= self.tick:
+            handles.append(self.queue.get()[1])
+        return handles
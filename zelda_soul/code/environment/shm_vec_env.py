@@ -0,0 +1,240 @@
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import gymnasium as gym
+from typing import Callable, Dict, List, Optional, Tuple
+
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import (
+    CloudpickleWrapper,
+    VecEnvObs,
+    VecEnvStepReturn,
+)
+from stable_baselines3.common.vec_env.util import dict_to_obs, obs_space_info
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]  # name, shape, dtype
+
+ALIGNMENT = 64
+
+
+def _layout(
+    observation_space: gym.Space, action_space: gym.Space, n_envs: int
+) -> List[ArraySpec]:
+    """Arrays kept in the shared block, each with the env index as first axis."""
+    keys, shapes, dtypes = obs_space_info(observation_space)
+    specs = []
+    for prefix in ("obs", "final_obs"):
+        for key in keys:
+            specs.append(
+                (f"{prefix}/{key}", (n_envs, *shapes[key]), np.dtype(dtypes[key]).str)
+            )
+    specs.append(
+        ("action", (n_envs, *action_space.shape), np.dtype(action_space.dtype).str)
+    )
+    specs.append(("reward", (n_envs,), np.dtype(np.float32).str))
+    specs.append(("done", (n_envs,), np.dtype(np.bool_).str))
+    return specs
+
+
+def _block_size(specs: List[ArraySpec]) -> int:
+    size = 0
+    for _, shape, dtype in specs:
+        size += -size % ALIGNMENT
+        size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return max(size, 1)
+
+
+def _arrays(buffer: memoryview, specs: List[ArraySpec]) -> Dict[str, np.ndarray]:
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in specs:
+        offset += -offset % ALIGNMENT
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+def _worker(
+    remote: mp.connection.Connection,
+    parent_remote: mp.connection.Connection,
+    env_fn_wrapper: CloudpickleWrapper,
+) -> None:
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    shm = None
+    obs, final_obs = {}, {}
+    bound = False
+
+    def write(observation, rows):
+        for key, row in rows.items():
+            row[...] = observation if key is None else observation[key]
+
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                action = arrays["action"][index]
+                observation, reward, terminated, truncated, info = env.step(action)
+                # convert to SB3 VecEnv api
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                if not bound:
+                    write(observation, obs)
+                if done:
+                    # keep the final observation, then reset into the same row
+                    for key, row in obs.items():
+                        final_obs[key][...] = row
+                    observation, reset_info = env.reset()
+                    if not bound:
+                        write(observation, obs)
+                    info["reset_info"] = reset_info
+                arrays["reward"][index] = reward
+                arrays["done"][index] = done
+                remote.send(info)
+            elif cmd == "reset":
+                maybe_options = {"options": data[1]} if data[1] else {}
+                observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                if not bound:
+                    write(observation, obs)
+                remote.send(reset_info)
+            elif cmd == "attach":
+                name, specs, index = data
+                shm = SharedMemory(name=name)
+                arrays = _arrays(shm.buf, specs)
+                keys, _, _ = obs_space_info(env.observation_space)
+                obs = {key: arrays[f"obs/{key}"][index] for key in keys}
+                final_obs = {key: arrays[f"final_obs/{key}"][index] for key in keys}
+                # let the env build its observations directly in shared memory
+                unwrapped = env.unwrapped
+                if hasattr(unwrapped, "bind_observation_buffers") and None not in obs:
+                    unwrapped.bind_observation_buffers(**obs)
+                    unwrapped.config.zero_copy_observation = True
+                    bound = True
+                remote.send(None)
+            elif cmd == "render":
+                remote.send(env.render())
+            elif cmd == "close":
+                env.close()
+                remote.close()
+                break
+            elif cmd == "get_spaces":
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "has_attr":
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == "set_attr":
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == "is_wrapped":
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class SharedMemoryVecEnv(SubprocVecEnv):
+    """SubprocVecEnv that passes observations through shared memory.
+
+    Observations, actions, rewards and dones live in one SharedMemory block
+    laid out per key of the observation space, so the pipes only carry step
+    signals and the (small) info dicts. Workers running an Environment build
+    their observations straight into their row of the block.
+
+    Drop-in for SubprocVecEnv, e.g.
+    ``make_vec_env(Environment, n_envs=8, vec_env_cls=SharedMemoryVecEnv)``.
+    """
+
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gym.Env]],
+        start_method: Optional[str] = None,
+    ):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for work_remote, remote, env_fn in zip(
+            self.work_remotes, self.remotes, env_fns
+        ):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn))
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        # VecEnv.__init__ of SubprocVecEnv's parent
+        super(SubprocVecEnv, self).__init__(n_envs, observation_space, action_space)
+
+        self.keys, _, _ = obs_space_info(observation_space)
+        specs = _layout(observation_space, action_space, n_envs)
+        self.shm = SharedMemory(create=True, size=_block_size(specs))
+        self.arrays = _arrays(self.shm.buf, specs)
+        for index, remote in enumerate(self.remotes):
+            remote.send(("attach", (self.shm.name, specs, index)))
+        for remote in self.remotes:
+            remote.recv()
+
+    def _obs(self, prefix: str, index: Optional[int] = None) -> VecEnvObs:
+        obs = {
+            key: (
+                self.arrays[f"{prefix}/{key}"].copy()
+                if index is None
+                else self.arrays[f"{prefix}/{key}"][index].copy()
+            )
+            for key in self.keys
+        }
+        return dict_to_obs(self.observation_space, obs)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.arrays["action"][...] = np.asarray(actions).reshape(
+            self.arrays["action"].shape
+        )
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self) -> VecEnvStepReturn:
+        infos = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        dones = self.arrays["done"].copy()
+        for index in np.flatnonzero(dones):
+            infos[index]["terminal_observation"] = self._obs("final_obs", index)
+            self.reset_infos[index] = infos[index].pop("reset_info", {})
+        return self._obs("obs"), self.arrays["reward"].copy(), dones, infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs("obs")
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        del self.arrays
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,93 @@
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+from entities.table import rebuild_base
+
+if TYPE_CHECKING:
+    from environment.env import Environment
+
+
+@dataclass
+class WorldSnapshot:
+    """Compact array copy of an Environment world.
+
+    Entities are stored as parallel arrays indexed by their position in
+    `handles`; `slots` is the creature table slot (-1 for resources) and
+    `hp`/`deleted` hold the resource state.
+    """
+
+    grid: Dict[str, Any]
+    table: Dict[str, Any]
+    kinds: np.ndarray
+    handles: np.ndarray
+    aliases: Tuple[str, ...]
+    locations: np.ndarray
+    slots: np.ndarray
+    hp: np.ndarray
+    deleted: np.ndarray
+    player: int
+    counters: Tuple[int, int, int]  # creature, resource, handle
+    step_count: int
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # BaseStats indices only hold in this process, see rebuild_base
+        state["table"] = {k: v for k, v in self.table.items() if k != "base"}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        table = self.table
+        table["base"] = rebuild_base(table["genome"], table["active"])
+
+
+class SnapshotPool:
+    """Worlds generated ahead of time, restored by Environment.reset().
+
+    `size` worlds are built when the pool is created, and unseeded resets
+    restore one of them picked with the caller's rng, so an environment
+    with a pool cycles through `size` distinct worlds.
+
+    Resets with a seed build their world on a private Environment whose
+    random.Random is seeded with it, so the caller's own rng and the global
+    random state are left alone; later resets with that seed restore a copy
+    of the saved arrays, skipping world generation. Each seed has a world of
+    its own, and the `size` most recently used ones are kept.
+    """
+
+    def __init__(self, make_env: Callable[[], "Environment"], size: int = 32) -> None:
+        self.size = size
+        self.worlds: "OrderedDict[Any, WorldSnapshot]" = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+        self._builder = make_env()
+        self.bank: List[WorldSnapshot] = [self._build() for _ in range(size)]
+
+    def _build(self) -> WorldSnapshot:
+        builder = self._builder
+        builder.clear()
+        builder.populate()
+        self.builds += 1
+        return builder.snapshot()
+
+    def pick(self, rng: random.Random) -> WorldSnapshot:
+        """One of the pre-built worlds, chosen with `rng`."""
+        self.hits += 1
+        return self.bank[rng.randrange(len(self.bank))]
+
+    def get(self, seed: Any) -> WorldSnapshot:
+        snapshot = self.worlds.get(seed)
+        if snapshot is not None:
+            self.worlds.move_to_end(seed)
+            self.hits += 1
+            return snapshot
+
+        self._builder.rng = random.Random(seed)
+        snapshot = self._build()
+        self.worlds[seed] = snapshot
+        if len(self.worlds) > self.size:
+            self.worlds.popitem(last=False)
+        return snapshot
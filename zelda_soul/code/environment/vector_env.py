@@ -0,0 +1,460 @@
+import numpy as np
+from gymnasium.vector import VectorEnv, AutoresetMode
+from gymnasium.vector.utils import batch_space
+from typing import Any, Dict, Optional, Tuple
+
+from entities.genome import GENOME_KEYS, PACKED_DTYPE, crossover, random_genomes
+from entities.stats import INIT_STAT_POINT, genome_stats
+from environment.env import Environment, EnvironmentConfig, STATUS_FIELDS
+from environment.grid import (
+    EMPTY,
+    TYPE_EMPTY,
+    TYPE_PLAYER,
+    TYPE_CREATURE,
+    TYPE_RESOURCE,
+)
+from settings import MAX_STEP_COUNT
+
+PLAYER = 0  # the player always occupies the first slot of its world
+
+# neighbour offsets in the row-major order Pathfinder scans them
+NEIGHBOURS = np.array(
+    [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy], dtype=np.int32
+)
+MOVES = {
+    "move_up": (0, -1),
+    "move_down": (0, 1),
+    "move_left": (-1, 0),
+    "move_right": (1, 0),
+}
+STATUS = {name: i for i, name in enumerate(STATUS_FIELDS)}
+
+
+class VectorEnvironment(VectorEnv):
+    """N copies of Environment stepped together in one process.
+
+    World state is held struct-of-arrays style: one (N, size, size) grid and
+    one (N, capacity) column per creature stat, with every entity in a world
+    addressed by its slot. step() applies the player actions of all worlds
+    with masked array ops and resets finished worlds in place (same-step
+    autoreset, the final observation is returned in infos["final_obs"]).
+
+    The rules follow Environment.step: only the player acts, the other
+    creatures and resources are passive. Observations follow the config's
+    observation_mode like Environment.observation, every mode batched.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(
+        self, num_envs: int, config: Optional[EnvironmentConfig] = None
+    ) -> None:
+        self.num_envs = num_envs
+        self.config = config if config else EnvironmentConfig()
+
+        template = Environment(self.config)
+        self.int_to_action = template.int_to_action
+        self.action_ids = {name: i for i, name in self.int_to_action.items()}
+        self.single_observation_space = template.observation_space
+        self.single_action_space = template.action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.n_types = template.n_types
+
+        size = self.config.size
+        n, self.n_cells = num_envs, size * size
+        # at most one birth per step, slots are not reused within an episode
+        self.n_init = self.config.n_creature + self.config.n_resource
+        cap = self.n_init + MAX_STEP_COUNT
+
+        self.ids = np.full((n, size, size), EMPTY, dtype=np.int32)
+        self.types = np.zeros((n, size, size), dtype=np.uint8)
+
+        self.kind = np.zeros((n, cap), dtype=np.uint8)
+        self.alive = np.zeros((n, cap), dtype=bool)
+        self.location = np.zeros((n, cap, 2), dtype=np.int32)
+        self.hp = np.zeros((n, cap), dtype=np.int32)
+        # Action.reproduce halves energy without rounding
+        self.energy = np.zeros((n, cap), dtype=np.float64)
+        self.max_hp = np.zeros((n, cap), dtype=np.int32)
+        self.max_energy = np.zeros((n, cap), dtype=np.int32)
+        self.attack = np.zeros((n, cap), dtype=np.int32)
+        self.attack_speed = np.zeros((n, cap), dtype=np.int32)
+        self.resistance = np.zeros((n, cap), dtype=np.int32)
+        self.heal = np.zeros((n, cap), dtype=np.int32)
+        self.harvest = np.zeros((n, cap), dtype=np.int32)
+        self.genome = np.zeros((n, cap, len(GENOME_KEYS)), dtype=PACKED_DTYPE)
+
+        self.status = np.zeros((n, len(STATUS_FIELDS)), dtype=np.int32)
+        self.n_entities = np.zeros(n, dtype=np.int32)
+        self.step_count = np.zeros(n, dtype=np.int32)
+        self.last_action = np.zeros(n, dtype=np.intp)
+
+        # observation buffers, one (n,) + shape array per observation key
+        self.buffers = {
+            key: np.zeros((n,) + space.shape, dtype=space.dtype)
+            for key, space in self.single_observation_space.spaces.items()
+        }
+        self.mode = self.config.observation_mode
+        self._onehot_action = None  # the grid and entities modes have none
+        flat = self.buffers.get("onehot", self.buffers.get("local"))
+        if flat is not None:
+            n_actions = len(self.int_to_action)
+            self._onehot_grid = flat[:, :-n_actions]
+            self._onehot_action = flat[:, -n_actions:]
+        self._cell_offsets = np.arange(self.n_cells, dtype=np.intp) * self.n_types
+        self._worlds = np.arange(n)
+        if self.mode == "egocentric":
+            view, block = self.config.view_size, self.config.overview_block
+            radius = view // 2
+            n_blocks = template.grid.n_blocks
+            # types padded with an off-the-map code, around the map for the
+            # view and up to whole tiles for the overview
+            side = max(size + radius, n_blocks * block) + radius
+            self._padded = np.full((n, side, side), self.n_types, dtype=np.uint8)
+            self._view = np.arange(view)
+            self._view_offsets = np.arange(view * view, dtype=np.intp) * self.n_types
+        elif self.mode == "entities":
+            cells = np.arange(self.n_cells)
+            self._cell_x, self._cell_y = cells % size, cells // size
+
+    def reset(
+        self, *, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        super().reset(seed=seed)
+        self._populate(self._worlds)
+        return self.observation(), {}
+
+    def _populate(self, worlds: np.ndarray) -> None:
+        """Regenerate the given worlds as Environment.populate would."""
+        k = len(worlds)
+        n_creature, n_init = self.config.n_creature, self.n_init
+        rng = self.np_random
+
+        self.ids[worlds] = EMPTY
+        self.types[worlds] = TYPE_EMPTY
+        self.kind[worlds] = TYPE_EMPTY
+        self.alive[worlds] = False
+        self.status[worlds] = 0
+        self.step_count[worlds] = 0
+        self.last_action[worlds] = 0
+        self.n_entities[worlds] = n_init
+
+        # distinct random cells for every initial entity
+        cells = np.argsort(rng.random((k, self.n_cells)), axis=1)[:, :n_init]
+        x = cells % self.config.size
+        y = cells // self.config.size
+        w = worlds[:, None]
+        slots = np.arange(n_init)
+        kind = np.full(n_init, TYPE_RESOURCE, dtype=np.uint8)
+        kind[:n_creature] = TYPE_CREATURE
+
+        self.location[w, slots, 0] = x
+        self.location[w, slots, 1] = y
+        self.kind[w, slots] = kind
+        self.alive[w, slots] = True
+        self.ids[w, y, x] = slots
+        self.types[w, y, x] = kind
+
+        # random genomes with one set bit per genome key
+        genome = random_genomes(k * n_creature, rng)
+        self.genome[w, slots[:n_creature]] = genome.reshape(k, n_creature, -1)
+        self._set_stats(w, slots[:n_creature])
+
+        hp = self.config.resource_hp
+        if not hp:
+            hp = rng.integers(50, 151, size=(k, self.config.n_resource))
+        self.hp[w, slots[n_creature:]] = hp
+        self.energy[w, slots[n_creature:]] = 0
+
+    def set_player_genomes(
+        self, genomes: np.ndarray, worlds: Optional[np.ndarray] = None
+    ) -> None:
+        """Give the players of `worlds` (default all) new packed genomes.
+
+        Their stats are derived again and hp and energy start over, as for a
+        newborn creature.
+        """
+        worlds = self._worlds if worlds is None else worlds
+        self.genome[worlds, PLAYER] = genomes
+        self._set_stats(worlds, PLAYER)
+
+    def _set_stats(self, worlds, slots) -> None:
+        """Derive creature stats from their genomes, as CreatureStat does."""
+        stats = genome_stats(self.genome[worlds, slots])
+        self.hp[worlds, slots] = INIT_STAT_POINT
+        self.energy[worlds, slots] = INIT_STAT_POINT
+        for name in (
+            "max_hp",
+            "max_energy",
+            "attack",
+            "attack_speed",
+            "resistance",
+            "heal",
+            "harvest",
+        ):
+            getattr(self, name)[worlds, slots] = stats[name]
+
+    def observation(self) -> Dict[str, np.ndarray]:
+        """Observations of every world as Environment.observation builds them,
+        in the config's observation_mode."""
+        if self.mode == "onehot":
+            self._onehot_observation()
+        elif self.mode == "grid":
+            self._grid_observation()
+        elif self.mode == "entities":
+            self._entity_observation()
+        else:
+            self._egocentric_observation()
+
+        if self._onehot_action is not None:
+            self._onehot_action.fill(0)
+            self._onehot_action[self._worlds, self.last_action] = 1
+
+        continuous = self.buffers["continuous"]
+        n_status = len(STATUS_FIELDS)
+        continuous[:, :n_status] = self.status
+        continuous[:, n_status] = self.hp[:, PLAYER]
+        continuous[:, n_status + 1] = self.energy[:, PLAYER]
+
+        return {key: buffer.copy() for key, buffer in self.buffers.items()}
+
+    def _player_cells(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.location[:, PLAYER, 0], self.location[:, PLAYER, 1]
+
+    def _onehot_observation(self) -> None:
+        w = self._worlds
+        x, y = self._player_cells()
+        player_cell = y * self.config.size + x
+
+        index = self._cell_offsets + self.types.reshape(len(w), -1)
+        index[w, player_cell] = self._cell_offsets[player_cell] + TYPE_PLAYER
+        self._onehot_grid.fill(0)
+        np.put_along_axis(self._onehot_grid, index, 1, axis=1)
+
+    def _grid_observation(self) -> None:
+        w = self._worlds
+        grid = self.buffers["grid"]
+        x, y = self._player_cells()
+        if self.config.grid_channels:
+            codes = np.arange(self.n_types, dtype=np.uint8).reshape(1, -1, 1, 1)
+            np.equal(codes, self.types[:, None], out=grid, casting="unsafe")
+            grid[w, :, y, x] = 0
+            grid[w, TYPE_PLAYER, y, x] = 1
+        else:
+            np.copyto(grid, self.types)
+            grid[w, y, x] = TYPE_PLAYER
+
+    def _entity_observation(self) -> None:
+        """The n_entities occupied cells nearest each player, ordered as
+        Grid.nearest orders them."""
+        w = self._worlds
+        size, count = self.config.size, self.config.n_entities
+        rows, mask = self.buffers["entities"], self.buffers["entity_mask"]
+        x, y = self._player_cells()
+
+        dx = np.abs(self._cell_x - x[:, None])
+        dy = np.abs(self._cell_y - y[:, None])
+        # Chebyshev distance, then Manhattan, then cell, as one sort key
+        key = (np.maximum(dx, dy) * 2 * size + dx + dy) * self.n_cells + np.arange(
+            self.n_cells
+        )
+        ids = self.ids.reshape(len(w), -1)
+        empty = ids == EMPTY
+        empty[w, y * size + x] = True  # the player itself
+        key[empty] = np.iinfo(key.dtype).max
+        count = min(count, self.n_cells)
+        cells = np.argpartition(key, count - 1, axis=1)[:, :count]
+        cells = np.take_along_axis(
+            cells, np.argsort(np.take_along_axis(key, cells, axis=1), axis=1), axis=1
+        )
+        found = ~np.take_along_axis(empty, cells, axis=1)
+        slots = np.take_along_axis(ids, cells, axis=1)
+
+        rows.fill(0)
+        rows[:, :count, 0] = cells % size - x[:, None]
+        rows[:, :count, 1] = cells // size - y[:, None]
+        rows[:, :count, 2] = self.kind[w[:, None], slots]
+        rows[:, :count, 3] = self.hp[w[:, None], slots]
+        creature = rows[:, :count, 2] == TYPE_CREATURE
+        rows[:, :count, 4] = np.where(creature, self.energy[w[:, None], slots], 0)
+        rows[:, :count][~found] = 0
+        mask.fill(0)
+        mask[:, :count] = found
+
+    def _egocentric_observation(self) -> None:
+        """One-hot view_size window centred on each player and the type
+        counts pooled over overview_block tiles, as in Environment."""
+        w = self._worlds
+        size, n_types = self.config.size, self.n_types
+        view, block = self.config.view_size, self.config.overview_block
+        radius = view // 2
+        x, y = self._player_cells()
+
+        padded = self._padded
+        padded[:, radius : radius + size, radius : radius + size] = self.types
+        rows = (y[:, None] + self._view)[:, :, None]
+        columns = (x[:, None] + self._view)[:, None, :]
+        local = padded[w[:, None, None], rows, columns].reshape(len(w), -1)
+        local[:, radius * view + radius] = TYPE_PLAYER
+
+        on_map = local < n_types
+        index = self._view_offsets + np.minimum(local, n_types - 1)
+        self._onehot_grid.fill(0)
+        np.put_along_axis(self._onehot_grid, index, on_map, axis=1)
+
+        overview = self.buffers["overview"]
+        n_blocks = overview.shape[1]
+        span = n_blocks * block
+        tiles = padded[:, radius : radius + span, radius : radius + span].reshape(
+            len(w), n_blocks, block, n_blocks, block
+        )
+        for cell_type in range(n_types):
+            np.sum(tiles == cell_type, axis=(2, 4), out=overview[..., cell_type])
+        by, bx = y // block, x // block
+        overview[w, by, bx, TYPE_CREATURE] -= 1
+        overview[w, by, bx, TYPE_PLAYER] += 1
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.intp).reshape(self.num_envs)
+        w = self._worlds
+        size = self.config.size
+        rewards = np.full(self.num_envs, -1.0)
+        ids = self.action_ids
+
+        terminated = self.hp[:, PLAYER] <= 0
+        self.status[terminated, STATUS["deleted"]] = 1
+        rewards[terminated] = -200
+        acting = ~terminated
+        self.status[acting, STATUS["lifespan"]] += 1
+
+        px = self.location[:, PLAYER, 0]
+        py = self.location[:, PLAYER, 1]
+        energy = self.energy[:, PLAYER]
+        has_energy = energy > 0
+
+        # adjacent cells, first creature / resource / empty cell in scan order
+        nx = px[:, None] + NEIGHBOURS[:, 0]
+        ny = py[:, None] + NEIGHBOURS[:, 1]
+        in_bounds = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+        cx, cy = np.clip(nx, 0, size - 1), np.clip(ny, 0, size - 1)
+        near_id = np.where(in_bounds, self.ids[w[:, None], cy, cx], EMPTY)
+        near_type = np.where(in_bounds, self.types[w[:, None], cy, cx], TYPE_EMPTY)
+        is_creature = near_type == TYPE_CREATURE
+        is_resource = near_type == TYPE_RESOURCE
+        is_free = in_bounds & (near_id == EMPTY)
+        creature = near_id[w, is_creature.argmax(axis=1)]
+        resource = near_id[w, is_resource.argmax(axis=1)]
+        free = is_free.argmax(axis=1)
+        has_creature = is_creature.any(axis=1)
+        has_resource = is_resource.any(axis=1)
+
+        # moves
+        for name, (dx, dy) in MOVES.items():
+            tx, ty = px + dx, py + dy
+            ok = acting & (actions == ids[name]) & has_energy
+            ok &= (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            ok &= (
+                self.ids[w, np.clip(ty, 0, size - 1), np.clip(tx, 0, size - 1)] == EMPTY
+            )
+            m = w[ok]
+            self._relocate(m, tx[ok], ty[ok])
+            self.energy[m, PLAYER] -= 1
+            self.status[m, STATUS["move"]] += 1
+            rewards[m] = 1
+
+        # attack the first adjacent creature
+        ok = acting & (actions == ids["attack"]) & has_creature & has_energy
+        m, t = w[ok], creature[ok]
+        damage = self.attack[m, PLAYER] * self.attack_speed[m, PLAYER]
+        damage = np.maximum(damage - self.resistance[m, t], 0)
+        self.hp[m, t] = np.maximum(self.hp[m, t] - damage, 0)
+        self.energy[m, PLAYER] -= 1
+        self.status[m, STATUS["attack"]] += 1
+        self.status[m, STATUS["killed"]] += self.hp[m, t] == 0
+        rewards[m] = 10
+
+        ok = acting & (actions == ids["heal_self"]) & has_energy
+        m = w[ok]
+        self.hp[m, PLAYER] = np.minimum(
+            self.hp[m, PLAYER] + self.heal[m, PLAYER], self.max_hp[m, PLAYER]
+        )
+        self.energy[m, PLAYER] -= 1
+        self.status[m, STATUS["heal"]] += 1
+        rewards[m] = 1
+
+        # heal_other is left at -1: Environment.step never resolves its target
+
+        # harvest the first adjacent resource
+        ok = acting & (actions == ids["harvest"]) & has_resource & has_energy
+        m, r = w[ok], resource[ok]
+        amount = self.harvest[m, PLAYER]
+        self.hp[m, PLAYER] = np.minimum(
+            self.hp[m, PLAYER] + amount, self.max_hp[m, PLAYER]
+        )
+        self.energy[m, PLAYER] = np.minimum(
+            self.energy[m, PLAYER] + amount, self.max_energy[m, PLAYER]
+        )
+        harvested = self.hp[m, r] > 0
+        m, r, amount = m[harvested], r[harvested], amount[harvested]
+        self.hp[m, r] = np.maximum(self.hp[m, r] - amount, 0)
+        self.status[m, STATUS["harvest"]] += 1
+        self.status[m, STATUS["collected"]] += self.hp[m, r] == 0
+        rewards[m] = 10
+
+        # reproduce with the first adjacent creature into the first free cell
+        ok = acting & (actions == ids["reproduce"]) & has_creature & is_free.any(axis=1)
+        ok &= energy >= self.max_energy[:, PLAYER] / 2
+        m, partner = w[ok], creature[ok]
+        if len(m):
+            child = self.n_entities[m]
+            self.n_entities[m] += 1
+            self.genome[m, child] = crossover(
+                self.genome[m, PLAYER], self.genome[m, partner], self.np_random
+            )
+            self._set_stats(m, child)
+            x, y = nx[m, free[m]], ny[m, free[m]]
+            self.location[m, child, 0] = x
+            self.location[m, child, 1] = y
+            self.kind[m, child] = TYPE_CREATURE
+            self.alive[m, child] = True
+            self.ids[m, y, x] = child
+            self.types[m, y, x] = TYPE_CREATURE
+            self.energy[m, PLAYER] /= 2
+            self.status[m, STATUS["reproduced"]] += 1
+            rewards[m] = 100
+
+        # remove entities with no hp left
+        dead_w, dead_slot = np.nonzero(self.alive & (self.hp <= 0) & acting[:, None])
+        x = self.location[dead_w, dead_slot, 0]
+        y = self.location[dead_w, dead_slot, 1]
+        self.ids[dead_w, y, x] = EMPTY
+        self.types[dead_w, y, x] = TYPE_EMPTY
+        self.alive[dead_w, dead_slot] = False
+
+        # decay
+        self.hp[:, PLAYER] -= 1
+        self.last_action[:] = actions
+        self.step_count += 1
+        truncated = self.step_count >= MAX_STEP_COUNT
+
+        obs = self.observation()
+        infos: Dict[str, Any] = {}
+        done = terminated | truncated
+        if done.any():
+            infos["final_obs"] = {key: value.copy() for key, value in obs.items()}
+            infos["_final_obs"] = done
+            self._populate(w[done])
+            obs = self.observation()
+
+        return obs, rewards, terminated, truncated, infos
+
+    def _relocate(self, worlds: np.ndarray, x: np.ndarray, y: np.ndarray) -> None:
+        old_x = self.location[worlds, PLAYER, 0]
+        old_y = self.location[worlds, PLAYER, 1]
+        self.ids[worlds, old_y, old_x] = EMPTY
+        self.types[worlds, old_y, old_x] = TYPE_EMPTY
+        self.ids[worlds, y, x] = PLAYER
+        self.types[worlds, y, x] = TYPE_CREATURE
+        self.location[worlds, PLAYER, 0] = x
+        self.location[worlds, PLAYER, 1] = y
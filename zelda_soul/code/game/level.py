@@ -6,6 +6,7 @@ import random
 from entities.resource import Resource
 from entities.creature import Creature
 from environment.env import Environment, EnvironmentConfig
+from environment.scheduler import ACT_INTERVAL
 from ai.simple_ai import SimpleAI
 from .movement import keyboard_move
 from .gresource import GameResource
@@ -27,7 +28,7 @@ class Level:
 
         self.env = env
         self.ai = SimpleAI()
-        self.sprites: Dict[str, Union[GameCreature, GameResource]] = {}
+        self.sprites: Dict[int, Union[GameCreature, GameResource]] = {}
 
         self.create_map()
 
@@ -49,7 +50,7 @@ class Level:
                     resource = self.env._create_resource((x, y))
 
                     surface = random.choice(graphics["grass"])
-                    self.sprites[resource.id] = GameResource(
+                    self.sprites[resource.handle] = GameResource(
                         resource,
                         surface,
                         self.visible_sprites,
@@ -61,11 +62,11 @@ class Level:
                         creature,
                         self.visible_sprites,
                     )
-                    self.sprites[creature.id] = self.player
+                    self.sprites[creature.handle] = self.player
 
                 elif cell == "3":
                     creature = self.env._create_creature((x, y))
-                    self.sprites[creature.id] = GameCreature(
+                    self.sprites[creature.handle] = GameCreature(
                         creature,
                         self.visible_sprites,
                     )
@@ -95,13 +96,13 @@ class Level:
         # remove all dead creatures and resources f
         # remove sprite
         deleted = [
-            id
-            for id, entity in self.env.entities.items()
+            handle
+            for handle, entity in self.env.entities.items()
             if entity.status.deleted is True
         ]
         if deleted:
-            for id in deleted:
-                self.sprites[id].kill()
+            for handle in deleted:
+                self.sprites[handle].kill()
                 # remove entity from environement
             self.env.remove_deleted(deleted)
 
@@ -117,7 +118,9 @@ class Level:
     async def run(self):
         self.frame_count += 1
         # trigger env step
-        if self.frame_count >= 64:
+        # env ticks run ACT_INTERVAL times faster than the old fixed step,
+        # so speed 1 creatures keep moving every 64 frames
+        if self.frame_count >= 64 // ACT_INTERVAL:
             self.env.env_step()
             self.sync_env()
             self.frame_count = 0
@@ -0,0 +1,69 @@
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from environment.env import Environment, EnvironmentConfig
+
+MODES = ("onehot", "egocentric", "grid", "entities")
+
+
+def _stepped(mode: str) -> Environment:
+    env = Environment(EnvironmentConfig(observation_mode=mode))
+    env.reset(seed=1)
+    for action in (0, 3, 1, 2):
+        env.step(action)
+    return env
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize(
+    "clone",
+    [copy.deepcopy, lambda env: pickle.loads(pickle.dumps(env))],
+    ids=["deepcopy", "pickle"],
+)
+def test_copied_env_writes_its_own_buffers(mode, clone):
+    env = _stepped(mode)
+    twin = clone(env)
+
+    observation = twin.observation(action_int=4, copy=False)
+    for key, buffer in observation.items():
+        assert np.shares_memory(buffer, twin.buffers[key])
+        assert not np.shares_memory(buffer, env.buffers[key])
+        np.testing.assert_array_equal(
+            buffer, env.observation(action_int=4, copy=False)[key]
+        )
+
+    # stepping the copy changes its observations, not the original's
+    before = {key: buffer.copy() for key, buffer in env.buffers.items()}
+    twin_observation, *_ = twin.step(0)
+    for key, buffer in twin_observation.items():
+        np.testing.assert_array_equal(buffer, twin.observation(action_int=0)[key])
+        np.testing.assert_array_equal(env.buffers[key], before[key])
+
+
+def test_fork_path_queries_leave_parent_caches_alone():
+    env = Environment(EnvironmentConfig(size=32, n_creature=4, n_resource=8))
+    env.reset(seed=2)
+    start = env.player.location
+    goal = next(
+        (x, y)
+        for x in range(31, -1, -1)
+        for y in range(31, -1, -1)
+        if env.grid.is_empty(x, y)
+    )
+    env.pathfinder.a_star_path_finder(start, goal, env)
+    before = env.pathfinder.cache_info()
+    actions_before = env.actions.pathfinder.cache_info()
+
+    fork = env.fork()
+    fork.pathfinder.a_star_path_finder(start, goal, fork)
+    fork.pathfinder.hierarchical_path_finder(start, goal, fork)
+    fork.pathfinder.flow_field(goal, fork)
+    for action in (0, 3, 1, 2):
+        fork.step(action)
+
+    assert fork.pathfinder.cache_info() != before
+    assert env.pathfinder.cache_info() == before
+    assert env.actions.pathfinder.cache_info() == actions_before
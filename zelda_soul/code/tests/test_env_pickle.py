@@ -0,0 +1,52 @@
+import json
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from environment.env import Environment, EnvironmentConfig
+
+CODE = Path(__file__).resolve().parents[1]
+STATS = ("max_hp", "attack", "move_speed")
+
+# registers BaseStats of its own first, so that its indices differ from ours
+LOADER = """
+import json, pickle, sys
+import numpy as np
+from entities.genome import random_genomes
+from entities.stats import base_indices
+from environment.env import Environment, EnvironmentConfig
+
+def stats(table):
+    slots = np.flatnonzero(table.active)
+    return {name: table.stat(name, slots).tolist() for name in %r}
+
+base_indices(random_genomes(64, np.random.default_rng(123)))
+env, snapshot = pickle.loads(sys.stdin.buffer.read())
+restored = Environment(EnvironmentConfig(n_creature=6))
+restored.reset()
+restored.restore(snapshot)
+print(json.dumps([stats(env.creatures), stats(restored.creatures)]))
+""" % (STATS,)
+
+
+def _stats(table):
+    slots = np.flatnonzero(table.active)
+    return {name: table.stat(name, slots).tolist() for name in STATS}
+
+
+def test_world_loads_in_a_fresh_interpreter():
+    env = Environment(EnvironmentConfig(n_creature=6))
+    env.reset(seed=3)
+    result = subprocess.run(
+        [sys.executable, "-c", LOADER],
+        input=pickle.dumps((env, env.snapshot())),
+        capture_output=True,
+        cwd=CODE,
+        check=True,
+    )
+    loaded, restored = json.loads(result.stdout)
+    assert loaded == _stats(env.creatures)
+    assert restored == _stats(env.creatures)
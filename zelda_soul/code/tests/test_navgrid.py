@@ -0,0 +1,83 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import random
+from collections import deque
+
+import pygame
+
+from environment.navgrid import NavGrid
+from environment.pathfinder import Pathfinder
+
+TILE = 16
+
+
+def _blocked(rects):
+    """Tiles under the rects, right and bottom edges excluded, cell by cell."""
+    cells = set()
+    for rect in rects:
+        for x in range(rect.left // TILE, (rect.right - 1) // TILE + 1):
+            for y in range(rect.top // TILE, (rect.bottom - 1) // TILE + 1):
+                cells.add((x, y))
+    return cells
+
+
+def _distance(start, goal, blocked, bounds):
+    """Breadth-first 4-connected steps from start to goal within bounds."""
+    (x0, y0), (x1, y1) = bounds
+    seen = {start: 0}
+    queue = deque([start])
+    while queue:
+        cell = queue.popleft()
+        if cell == goal:
+            return seen[cell]
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            x, y = cell[0] + dx, cell[1] + dy
+            if x0 <= x <= x1 and y0 <= y <= y1 and (x, y) not in blocked:
+                if (x, y) not in seen:
+                    seen[(x, y)] = seen[cell] + 1
+                    queue.append((x, y))
+    return None
+
+
+def test_rect_list_paths_match_a_cell_by_cell_search():
+    rng = random.Random(5)
+    pathfinder = Pathfinder()
+    for _ in range(50):
+        rects = [
+            pygame.Rect(
+                rng.randrange(0, 20 * TILE),
+                rng.randrange(0, 20 * TILE),
+                rng.randrange(1, 3 * TILE),
+                rng.randrange(1, 3 * TILE),
+            )
+            for _ in range(25)
+        ]
+        blocked = _blocked(rects)
+        start = pygame.Vector2(rng.randrange(0, 20 * TILE), rng.randrange(0, 20 * TILE))
+        goal = pygame.Vector2(rng.randrange(0, 20 * TILE), rng.randrange(0, 20 * TILE))
+        start_cell = (int(start.x // TILE), int(start.y // TILE))
+        goal_cell = (int(goal.x // TILE), int(goal.y // TILE))
+
+        nav = NavGrid.from_rects(rects, [start_cell, goal_cell], TILE)
+        assert {
+            (x, y)
+            for x in range(-2, 24)
+            for y in range(-2, 24)
+            if nav.index((x, y)) is not None and not nav.is_walkable((x, y))
+        } == blocked
+
+        path = pathfinder.astar_pathfinding(start, goal, rects, TILE)
+        target = nav.nearest_walkable(goal_cell)
+        bounds = (nav.origin, nav.cell(nav.width * nav.height - 1))
+        expected = _distance(start_cell, target, blocked, bounds)
+        if expected is None:
+            assert path == []
+            continue
+        assert len(path) == expected
+        cells = [start_cell] + [(int(p.x // TILE), int(p.y // TILE)) for p in path]
+        assert cells[-1] == target
+        assert not blocked & set(cells[1:])
+        for (ax, ay), (bx, by) in zip(cells, cells[1:]):
+            assert abs(ax - bx) + abs(ay - by) == 1
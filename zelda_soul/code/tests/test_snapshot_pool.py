@@ -0,0 +1,31 @@
+import numpy as np
+
+from environment.env import Environment, EnvironmentConfig
+
+
+def _world(env):
+    return env.grid.snapshot()["types"].tobytes()
+
+
+def test_unseeded_resets_restore_prebuilt_worlds():
+    env = Environment(EnvironmentConfig(snapshot_pool=4))
+    bank = {snapshot.grid["types"].tobytes() for snapshot in env.pool.bank}
+    assert env.pool.builds == 4
+
+    for _ in range(8):
+        env.reset()
+        assert _world(env) in bank
+    assert env.pool.builds == 4
+
+
+def test_seeded_resets_stay_deterministic():
+    env = Environment(EnvironmentConfig(snapshot_pool=4))
+    env.reset(seed=7)
+    first = _world(env)
+    env.reset()
+    env.reset(seed=7)
+    assert _world(env) == first
+    assert np.array_equal(
+        Environment(EnvironmentConfig(snapshot_pool=1)).pool.get(7).grid["types"],
+        env.pool.get(7).grid["types"],
+    )
@@ -38,6 +38,24 @@ class PriorityQueueWithUpdate:
                 return priority, task
         raise KeyError('pop from an empty priority queue')
     
+    def peek(self):
+        """Return the lowest-priority entry without removing it."""
+        while self.heap and self.heap[0][-1] is self.REMOVED:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            raise KeyError('peek at an empty priority queue')
+        priority, count, task = self.heap[0]
+        return priority, task
+
+    def copy(self):
+        """Return an independent queue holding the same valid tasks."""
+        queue = PriorityQueueWithUpdate()
+        queue.counter = self.counter
+        queue.entry_finder = {task: list(entry) for task, entry in self.entry_finder.items()}
+        queue.heap = list(queue.entry_finder.values())
+        heapq.heapify(queue.heap)
+        return queue
+
     def qsize(self):
         """Return the number of valid tasks in the queue."""
         return len(self.entry_finder)